@@ -0,0 +1,200 @@
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.fake_bot import FakeBot, FakeSession
+from benchmarks.fixtures import AUDIO_FIXTURES, VIDEO_FIXTURES, Fixture, make_fixture
+from bot.config import config
+from bot.services import pipeline
+from bot.services.jobs import ConversionJob, KIND_CIRCLE, KIND_EXTRACT, KIND_VOICE
+from bot.services.scheduler import JobScheduler, LANE_AUDIO, LANE_VIDEO
+from bot.utils.media_detect import MediaFile
+
+PATH_FIXTURES = {
+    KIND_CIRCLE: VIDEO_FIXTURES,
+    KIND_EXTRACT: VIDEO_FIXTURES,
+    KIND_VOICE: AUDIO_FIXTURES,
+}
+
+RSS_SAMPLE_INTERVAL = 0.05
+
+
+def read_rss(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+class RSSSampler:
+    
+    def __init__(self):
+        self.peak = 0
+        self._task: asyncio.Task | None = None
+    
+    def sample(self) -> int:
+        pids = [os.getpid(), *(process.pid for process in pipeline.supervisor.running)]
+        return sum(read_rss(pid) for pid in pids)
+    
+    async def _run(self):
+        while True:
+            self.peak = max(self.peak, self.sample())
+            await asyncio.sleep(RSS_SAMPLE_INTERVAL)
+    
+    def __enter__(self) -> "RSSSampler":
+        self._task = asyncio.create_task(self._run())
+        return self
+    
+    def __exit__(self, *exc):
+        self._task.cancel()
+        if not self.peak:
+            self.peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+def media_file(fixture: Fixture, path: Path, unique_id: str) -> MediaFile:
+    return MediaFile(
+        file_id=str(path),
+        file_unique_id=unique_id,
+        file_size=path.stat().st_size,
+        filename=fixture.filename,
+        duration=fixture.duration,
+        width=fixture.width,
+        height=fixture.height,
+    )
+
+
+async def run_level(
+    kind: str,
+    fixtures: list[tuple[Fixture, Path]],
+    concurrency: int,
+    jobs: int,
+    local_api: bool
+) -> dict:
+    pipeline.scheduler = JobScheduler(
+        lanes={LANE_VIDEO: (concurrency, math.inf), LANE_AUDIO: (concurrency, math.inf)},
+        per_user_limit=jobs
+    )
+    bot = FakeBot(session=FakeSession(local=local_api))
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    output_bytes = {}
+    
+    async def run_job(index: int) -> bool:
+        fixture, path = fixtures[index % len(fixtures)]
+        chat_id = index + 1
+        job = ConversionJob(
+            kind=kind,
+            user_id=chat_id,
+            chat_id=chat_id,
+            media=media_file(fixture, path, f"{fixture.filename}-{concurrency}-{index}"),
+            reply_to_message_id=1
+        )
+        async with semaphore:
+            started_at = time.perf_counter()
+            await pipeline.execute_job(bot, job)
+            latencies.append(time.perf_counter() - started_at)
+        
+        uploads = bot.uploads(chat_id)
+        if not uploads:
+            return False
+        output_bytes.setdefault(fixture.filename, uploads[0].size)
+        return True
+    
+    with RSSSampler() as sampler:
+        started_at = time.perf_counter()
+        results = await asyncio.gather(*(run_job(index) for index in range(jobs)))
+        wall_time = time.perf_counter() - started_at
+    await bot.session.close()
+    
+    succeeded = sum(results)
+    return {
+        "concurrency": concurrency,
+        "jobs": jobs,
+        "failed": jobs - succeeded,
+        "wall_time": round(wall_time, 3),
+        "jobs_per_min": round(succeeded * 60 / wall_time, 2) if wall_time else 0.0,
+        "latency_p50": round(percentile(latencies, 0.5), 3),
+        "latency_p95": round(percentile(latencies, 0.95), 3),
+        "peak_rss_mb": round(sampler.peak / (1024 * 1024), 1),
+        "output_bytes": dict(sorted(output_bytes.items())),
+    }
+
+
+def command_output(*cmd: str) -> str:
+    try:
+        return subprocess.run(cmd, capture_output=True, text=True, check=True).stdout.splitlines()[0]
+    except (OSError, subprocess.CalledProcessError, IndexError):
+        return ""
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the conversion pipeline on synthetic media")
+    parser.add_argument("--paths", default=",".join(PATH_FIXTURES), help="comma separated: circle,extract,voice")
+    parser.add_argument("--concurrency", default="1,2,4", help="comma separated concurrency levels")
+    parser.add_argument("--jobs", type=int, default=8, help="jobs per path and concurrency level")
+    parser.add_argument("--profile", default="quality", help="encoder profile for video notes")
+    parser.add_argument("--no-streaming", action="store_true", help="always download to temp files")
+    parser.add_argument("--local-api", action="store_true", help="read inputs in place like a local Bot API server")
+    parser.add_argument("--fixtures-dir", default="/tmp/bot_benchmark_fixtures")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    
+    config.encoder_profile = args.profile
+    config.streaming_enabled = not args.no_streaming
+    
+    paths = [item for item in args.paths.split(",") if item]
+    levels = [int(item) for item in args.concurrency.split(",") if item]
+    fixtures_dir = Path(args.fixtures_dir)
+    
+    report = {
+        "commit": command_output("git", "rev-parse", "--short", "HEAD"),
+        "ffmpeg": command_output("ffmpeg", "-hide_banner", "-version"),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "profile": args.profile,
+        "streaming": config.streaming_enabled,
+        "local_api": args.local_api,
+        "results": {},
+    }
+    
+    for kind in paths:
+        fixtures = [(fixture, make_fixture(fixture, fixtures_dir)) for fixture in PATH_FIXTURES[kind]]
+        report["results"][kind] = [
+            await run_level(kind, fixtures, level, args.jobs, args.local_api)
+            for level in levels
+        ]
+    
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,163 @@
+import itertools
+import os
+import socket
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+
+import aiohttp
+from aiohttp import web
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import BareFilesPathWrapper
+from aiogram.types import FSInputFile, InputFile
+
+
+@dataclass
+class Call:
+    method: str
+    chat_id: int
+    size: int = 0
+    duration: int = 0
+    text: str = ""
+
+
+class FileServer:
+    
+    def __init__(self, ranges: bool = True, cut_after: int = 0):
+        self.ranges = ranges
+        self.cut_after = cut_after
+        self.requests = 0
+        self.range_headers: list[str] = []
+        self._cut: set[int] = set()
+        self.socket = socket.socket()
+        self.socket.bind(("127.0.0.1", 0))
+        self.socket.listen()
+        self.base = "http://127.0.0.1:%d" % self.socket.getsockname()[1]
+        self._runner: web.AppRunner | None = None
+    
+    async def serve(self, request: web.Request) -> web.StreamResponse:
+        self.requests += 1
+        if "Range" in request.headers:
+            self.range_headers.append(request.headers["Range"])
+        path = "/" + request.match_info["path"].lstrip("/")
+        if not os.path.isfile(path):
+            raise web.HTTPNotFound()
+        if not self.ranges:
+            return web.Response(body=open(path, "rb").read())
+        if self.cut_after and request.http_range.stop is not None and request.http_range.stop not in self._cut:
+            self._cut.add(request.http_range.stop)
+            return await self.cut(request, path)
+        return web.FileResponse(path)
+    
+    async def cut(self, request: web.Request, path: str) -> web.StreamResponse:
+        size = os.path.getsize(path)
+        start, stop = request.http_range.start, min(request.http_range.stop, size)
+        response = web.StreamResponse(status=206, headers={
+            "Content-Range": f"bytes {start}-{stop - 1}/{size}",
+            "Content-Length": str(stop - start),
+        })
+        await response.prepare(request)
+        with open(path, "rb") as f:
+            f.seek(start)
+            await response.write(f.read(min(self.cut_after, stop - start)))
+        request.transport.close()
+        return response
+    
+    async def start(self):
+        if self._runner is not None:
+            return
+        app = web.Application()
+        app.router.add_get("/file/{token}/{path:.*}", self.serve)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.SockSite(self._runner, self.socket).start()
+    
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+class FakeApi:
+    
+    def __init__(self, base: str, is_local: bool = False):
+        self.base = base
+        self.is_local = is_local
+        self.wrap_local_file = BareFilesPathWrapper()
+    
+    def file_url(self, token: str, path: str) -> str:
+        return f"{self.base}/file/bot{token}/{path}"
+
+
+class FakeSession(AiohttpSession):
+    
+    def __init__(self, local: bool = False, ranges: bool = True, cut_after: int = 0):
+        super().__init__()
+        self.server = FileServer(ranges=ranges, cut_after=cut_after)
+        self.api = FakeApi(self.server.base, is_local=local)
+    
+    async def create_session(self) -> aiohttp.ClientSession:
+        session = await super().create_session()
+        await self.server.start()
+        return session
+    
+    async def close(self):
+        await super().close()
+        await self.server.stop()
+
+
+@dataclass
+class FakeBot:
+    token: str = "0:benchmark"
+    session: FakeSession = field(default_factory=FakeSession)
+    calls: list[Call] = field(default_factory=list)
+    
+    def __post_init__(self):
+        self._message_ids = itertools.count(1)
+    
+    def _message(self, chat_id: int, text: str = "", file_id: str = "") -> SimpleNamespace:
+        return SimpleNamespace(
+            message_id=next(self._message_ids),
+            chat=SimpleNamespace(id=chat_id),
+            text=text,
+            voice=SimpleNamespace(file_id=file_id),
+            video_note=SimpleNamespace(file_id=file_id),
+        )
+    
+    async def _consume(self, file: InputFile | str) -> int:
+        if isinstance(file, str):
+            return 0
+        if isinstance(file, FSInputFile):
+            return os.path.getsize(file.path)
+        size = 0
+        async for chunk in file.read(self):
+            size += len(chunk)
+        return size
+    
+    async def get_file(self, file_id: str) -> SimpleNamespace:
+        return SimpleNamespace(file_id=file_id, file_path=file_id, file_size=os.path.getsize(file_id))
+    
+    async def send_message(self, chat_id: int, text: str, **kwargs) -> SimpleNamespace:
+        self.calls.append(Call("send_message", chat_id, text=text))
+        return self._message(chat_id, text)
+    
+    async def edit_message_text(self, text: str, chat_id: int, message_id: int, **kwargs):
+        self.calls.append(Call("edit_message_text", chat_id, text=text))
+    
+    async def send_voice(self, chat_id: int, voice: InputFile | str, duration: int = 0, **kwargs) -> SimpleNamespace:
+        size = await self._consume(voice)
+        self.calls.append(Call("send_voice", chat_id, size=size, duration=duration))
+        return self._message(chat_id, file_id=f"voice-{chat_id}")
+    
+    async def send_video_note(
+        self,
+        chat_id: int,
+        video_note: InputFile | str,
+        duration: int = 0,
+        **kwargs
+    ) -> SimpleNamespace:
+        size = await self._consume(video_note)
+        self.calls.append(Call("send_video_note", chat_id, size=size, duration=duration))
+        return self._message(chat_id, file_id=f"video-note-{chat_id}")
+    
+    def uploads(self, chat_id: int) -> list[Call]:
+        return [call for call in self.calls if call.chat_id == chat_id and call.method.startswith("send_v")]
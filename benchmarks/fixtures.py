@@ -0,0 +1,92 @@
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+
+X264_ARGS = ["-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p"]
+AAC_ARGS = ["-c:a", "aac", "-b:a", "128k"]
+BITEXACT_ARGS = ["-map_metadata", "-1", "-fflags", "+bitexact", "-flags:v", "+bitexact", "-flags:a", "+bitexact"]
+
+CONTAINER_ARGS = {
+    "mp4": [*X264_ARGS, *AAC_ARGS],
+    "mp4-faststart": [*X264_ARGS, *AAC_ARGS, "-movflags", "+faststart"],
+    "mov": [*X264_ARGS, *AAC_ARGS],
+    "mkv": [*X264_ARGS, *AAC_ARGS],
+    "webm": ["-c:v", "libvpx", "-deadline", "realtime", "-cpu-used", "8", "-b:v", "1M", "-c:a", "libopus"],
+    "mp3": ["-c:a", "libmp3lame", "-b:a", "128k"],
+    "wav": ["-c:a", "pcm_s16le"],
+    "m4a": AAC_ARGS,
+    "ogg": ["-c:a", "libvorbis"],
+    "flac": ["-c:a", "flac"],
+}
+
+
+@dataclass(frozen=True)
+class Fixture:
+    name: str
+    container: str
+    duration: int
+    width: int = 0
+    height: int = 0
+
+    @property
+    def has_video(self) -> bool:
+        return self.width > 0
+
+    @property
+    def extension(self) -> str:
+        return "." + self.container.split("-")[0]
+
+    @property
+    def filename(self) -> str:
+        return f"{self.name}{self.extension}"
+
+
+VIDEO_FIXTURES = [
+    Fixture("landscape_360p_10s_faststart", "mp4-faststart", 10, 640, 360),
+    Fixture("landscape_720p_30s", "mp4", 30, 1280, 720),
+    Fixture("portrait_720x1280_15s_faststart", "mp4-faststart", 15, 720, 1280),
+    Fixture("square_720p_20s", "mkv", 20, 720, 720),
+    Fixture("classic_480p_75s", "mov", 75, 640, 480),
+    Fixture("landscape_360p_20s", "webm", 20, 640, 360),
+]
+
+AUDIO_FIXTURES = [
+    Fixture("sine_30s", "mp3", 30),
+    Fixture("sine_120s", "wav", 120),
+    Fixture("sine_60s", "m4a", 60),
+    Fixture("sine_45s", "ogg", 45),
+    Fixture("sine_60s", "flac", 60),
+]
+
+
+def lavfi_sources(fixture: Fixture) -> list[str]:
+    sources = ["-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=48000:duration={fixture.duration}"]
+    if fixture.has_video:
+        sources = [
+            "-f", "lavfi",
+            "-i", f"testsrc=size={fixture.width}x{fixture.height}:rate=30:duration={fixture.duration}",
+            *sources,
+        ]
+    return sources
+
+
+def make_fixture(fixture: Fixture, directory: Path) -> Path:
+    path = directory / fixture.filename
+    if path.exists():
+        return path
+    
+    directory.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(f"partial_{path.name}")
+    subprocess.run(
+        [
+            "ffmpeg", "-y", "-v", "error",
+            *lavfi_sources(fixture),
+            *CONTAINER_ARGS[fixture.container],
+            *BITEXACT_ARGS,
+            "-shortest",
+            str(partial),
+        ],
+        check=True
+    )
+    partial.rename(path)
+    return path
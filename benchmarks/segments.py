@@ -0,0 +1,84 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.fixtures import Fixture, make_fixture
+from bot.config import config
+from bot.services.converter import ConversionService
+from bot.services.profiles import load_profiles, threads_per_job
+
+FIXTURE = Fixture("landscape_1080p_60s", "mp4", 60, 1920, 1080)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare single-process and segment-parallel video note encoding")
+    parser.add_argument("--segments", default="1,2,4", help="comma separated segment counts, 1 = single process")
+    parser.add_argument("--profile", default="quality", help="encoder profile")
+    parser.add_argument("--threads", type=int, default=0, help="x264 threads per ffmpeg (0 = one job's share of cores)")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per segment count, the fastest is reported")
+    parser.add_argument("--fixtures-dir", default="/tmp/bot_benchmark_fixtures")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    converter = ConversionService()
+    profile = load_profiles(config.encoder_profiles)[args.profile]
+    threads = args.threads or threads_per_job(config.max_concurrent_tasks)
+    
+    fixtures_dir = Path(args.fixtures_dir)
+    source = make_fixture(FIXTURE, fixtures_dir)
+    media_probe = await converter.probe(str(source))
+    
+    report = {
+        "cpu_count": os.cpu_count(),
+        "profile": args.profile,
+        "threads": threads,
+        "input": FIXTURE.filename,
+        "results": [],
+    }
+    baseline = 0.0
+    for segments in (int(item) for item in args.segments.split(",") if item):
+        output = fixtures_dir / f"segments_{segments}.mp4"
+        timings = []
+        for _ in range(args.repeat):
+            started_at = time.perf_counter()
+            result = await converter.convert_to_video_note(
+                str(source),
+                str(output),
+                config.video_note_size,
+                config.max_video_duration,
+                media_probe=media_probe,
+                profile=profile,
+                threads=threads,
+                segments=segments
+            )
+            timings.append(time.perf_counter() - started_at)
+            if not result.success:
+                raise RuntimeError(result.error)
+        
+        wall_time = min(timings)
+        baseline = baseline or wall_time
+        report["results"].append({
+            "segments": result.segments,
+            "wall_time": round(wall_time, 3),
+            "speedup": round(baseline / wall_time, 2),
+            "duration": result.duration,
+            "output_bytes": output.stat().st_size,
+        })
+        output.unlink()
+    
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+import asyncio
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.fixtures import Fixture, make_fixture
+from bot.services.converter import ConversionService
+
+BASELINE_SUBPROCESSES = {
+    "video_note": 3,
+    "voice": 2,
+    "extract": 2,
+}
+
+
+VIDEO_FIXTURE = Fixture("input", "mp4", 75, 640, 360)
+AUDIO_FIXTURE = Fixture("input", "mp3", 20)
+
+
+class SpawnCounter:
+    
+    def __init__(self):
+        self.count = 0
+        self._original = asyncio.create_subprocess_exec
+    
+    async def __call__(self, *args, **kwargs):
+        self.count += 1
+        return await self._original(*args, **kwargs)
+    
+    def __enter__(self) -> "SpawnCounter":
+        asyncio.create_subprocess_exec = self
+        return self
+    
+    def __exit__(self, *exc):
+        asyncio.create_subprocess_exec = self._original
+
+
+async def count_spawns(job) -> int:
+    with SpawnCounter() as counter:
+        result = await job
+    if not result.success:
+        raise RuntimeError(result.error)
+    return counter.count
+
+
+async def main():
+    converter = ConversionService()
+    report = {}
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        video = make_fixture(VIDEO_FIXTURE, tmp_dir)
+        audio = make_fixture(AUDIO_FIXTURE, tmp_dir)
+        
+        report["video_note"] = await count_spawns(
+            converter.convert_to_video_note(str(video), str(tmp_dir / "note.mp4"), 480, 60)
+        )
+        report["voice"] = await count_spawns(
+            converter.convert_to_voice(str(audio), str(tmp_dir / "voice.ogg"))
+        )
+        report["extract"] = await count_spawns(
+            converter.extract_audio_from_video(str(video), str(tmp_dir / "extract.ogg"))
+        )
+    
+    json.dump(
+        {
+            kind: {"baseline": BASELINE_SUBPROCESSES[kind], "current": count}
+            for kind, count in report.items()
+        },
+        sys.stdout,
+        indent=2
+    )
+    print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
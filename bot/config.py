@@ -12,7 +12,78 @@ class Config:
     video_note_size: int
     max_video_duration: int
     max_file_size: int = 20 * 1024 * 1024
+    max_upload_size: int = 50 * 1024 * 1024
+    max_audio_duration: int = 0
+    bot_api_url: str = ""
+    bot_api_local: bool = False
+    bot_api_server_dir: str = ""
+    bot_api_local_dir: str = ""
+    api_timeout: int = 60
+    api_upload_timeout: int = 300
+    api_pool_size: int = 0
+    api_keepalive: int = 30
+    api_retries: int = 3
+    api_retry_max_delay: int = 30
+    outbound_global_rate: float = 30.0
+    outbound_chat_rate: float = 1.0
+    outbound_chat_burst: int = 3
+    outbound_group_rate: float = 20.0
     temp_dir: str = "/tmp/bot_files"
+    temp_quota_mb: int = 448
+    temp_wait_timeout: int = 120
+    temp_sweep_interval: int = 600
+    temp_stale_after: int = 3600
+    streaming_enabled: bool = True
+    status_edit_interval: float = 3.0
+    job_timeout: int = 300
+    ffmpeg_cpu_limit: int = 600
+    ffmpeg_memory_limit_mb: int = 0
+    ffmpeg_nice: int = 5
+    audio_lane_slots: int = 1
+    video_lane_capacity: float = 0.0
+    audio_lane_capacity: float = 0.0
+    per_user_job_limit: int = 2
+    encoder_profile: str = "auto"
+    encoder_profiles: str = ""
+    profile_balanced_queue: int = 2
+    profile_fast_queue: int = 6
+    cache_backend: str = "memory"
+    cache_path: str = "data/cache.sqlite3"
+    cache_max_entries: int = 10000
+    cache_ttl: int = 7 * 24 * 3600
+    job_queue: str = ""
+    job_queue_path: str = "data/jobs.sqlite3"
+    job_lease_timeout: int = 60
+    job_max_attempts: int = 3
+    worker_concurrency: int = 0
+    bot_mode: str = "polling"
+    webhook_url: str = ""
+    webhook_path: str = "/webhook"
+    webhook_secret: str = ""
+    webhook_host: str = "0.0.0.0"
+    webhook_port: int = 8080
+    fsm_storage: str = "memory"
+    fsm_storage_path: str = "data/fsm.sqlite3"
+    fsm_flush_interval: float = 1.0
+    fsm_cache_ttl: float = 30.0
+    redis_url: str = "redis://localhost:6379/0"
+    metrics_host: str = "0.0.0.0"
+    metrics_port: int = 9090
+    batch_window: float = 1.0
+    batch_max_files: int = 10
+    segment_workers: int = 0
+    segment_min_duration: int = 20
+    sniff_kb: int = 256
+    download_connections: int = 4
+    download_part_mb: int = 2
+    throttle_user_rate: int = 30
+    throttle_chat_rate: int = 60
+    throttle_burst: int = 10
+    max_pending_jobs: int = 10
+    throttle_max_keys: int = 100000
+    drain_timeout: int = 60
+    drain_state_path: str = "data/pending_jobs.jsonl"
+    drop_pending_updates: bool = False
 
     @classmethod
     def from_env(cls) -> "Config":
@@ -20,11 +91,88 @@ class Config:
         if not token:
             raise ValueError("BOT_TOKEN is required")
         
+        bot_api_local = getenv("BOT_API_LOCAL", "0") == "1"
+        default_size_mb = "2000" if bot_api_local else "20"
+        default_upload_mb = "2000" if bot_api_local else "50"
+        
         return cls(
             bot_token=token,
             max_concurrent_tasks=int(getenv("MAX_CONCURRENT_TASKS", "4")),
             video_note_size=int(getenv("VIDEO_NOTE_SIZE", "480")),
             max_video_duration=int(getenv("MAX_VIDEO_DURATION", "60")),
+            max_file_size=int(getenv("MAX_FILE_SIZE_MB") or default_size_mb) * 1024 * 1024,
+            max_upload_size=int(getenv("MAX_UPLOAD_SIZE_MB") or default_upload_mb) * 1024 * 1024,
+            max_audio_duration=int(getenv("MAX_AUDIO_DURATION", "0")),
+            bot_api_url=getenv("BOT_API_URL", "").rstrip("/"),
+            bot_api_local=bot_api_local,
+            bot_api_server_dir=getenv("BOT_API_SERVER_DIR", ""),
+            bot_api_local_dir=getenv("BOT_API_LOCAL_DIR", ""),
+            api_timeout=int(getenv("API_TIMEOUT", "60")),
+            api_upload_timeout=int(getenv("API_UPLOAD_TIMEOUT", "300")),
+            api_pool_size=int(getenv("API_POOL_SIZE", "0")),
+            api_keepalive=int(getenv("API_KEEPALIVE", "30")),
+            api_retries=int(getenv("API_RETRIES", "3")),
+            api_retry_max_delay=int(getenv("API_RETRY_MAX_DELAY", "30")),
+            outbound_global_rate=float(getenv("OUTBOUND_GLOBAL_RATE", "30")),
+            outbound_chat_rate=float(getenv("OUTBOUND_CHAT_RATE", "1")),
+            outbound_chat_burst=int(getenv("OUTBOUND_CHAT_BURST", "3")),
+            outbound_group_rate=float(getenv("OUTBOUND_GROUP_RATE", "20")),
+            temp_dir=getenv("TEMP_DIR", "/tmp/bot_files"),
+            temp_quota_mb=int(getenv("TEMP_QUOTA_MB", "448")),
+            temp_wait_timeout=int(getenv("TEMP_WAIT_TIMEOUT", "120")),
+            temp_sweep_interval=int(getenv("TEMP_SWEEP_INTERVAL", "600")),
+            temp_stale_after=int(getenv("TEMP_STALE_AFTER", "3600")),
+            streaming_enabled=getenv("STREAMING_ENABLED", "1") == "1",
+            status_edit_interval=float(getenv("STATUS_EDIT_INTERVAL", "3")),
+            job_timeout=int(getenv("JOB_TIMEOUT", "300")),
+            ffmpeg_cpu_limit=int(getenv("FFMPEG_CPU_LIMIT", "600")),
+            ffmpeg_memory_limit_mb=int(getenv("FFMPEG_MEMORY_LIMIT_MB", "0")),
+            ffmpeg_nice=int(getenv("FFMPEG_NICE", "5")),
+            audio_lane_slots=int(getenv("AUDIO_LANE_SLOTS", "1")),
+            video_lane_capacity=float(getenv("VIDEO_LANE_CAPACITY", "0")),
+            audio_lane_capacity=float(getenv("AUDIO_LANE_CAPACITY", "0")),
+            per_user_job_limit=int(getenv("PER_USER_JOB_LIMIT", "2")),
+            encoder_profile=getenv("ENCODER_PROFILE", "auto").lower(),
+            encoder_profiles=getenv("ENCODER_PROFILES", ""),
+            profile_balanced_queue=int(getenv("PROFILE_BALANCED_QUEUE", "2")),
+            profile_fast_queue=int(getenv("PROFILE_FAST_QUEUE", "6")),
+            cache_backend=getenv("CACHE_BACKEND", "memory").lower(),
+            cache_path=getenv("CACHE_PATH", "data/cache.sqlite3"),
+            cache_max_entries=int(getenv("CACHE_MAX_ENTRIES", "10000")),
+            cache_ttl=int(getenv("CACHE_TTL", str(7 * 24 * 3600))),
+            job_queue=getenv("JOB_QUEUE", "").lower(),
+            job_queue_path=getenv("JOB_QUEUE_PATH", "data/jobs.sqlite3"),
+            job_lease_timeout=int(getenv("JOB_LEASE_TIMEOUT", "60")),
+            job_max_attempts=int(getenv("JOB_MAX_ATTEMPTS", "3")),
+            worker_concurrency=int(getenv("WORKER_CONCURRENCY", "0")),
+            bot_mode=getenv("BOT_MODE", "polling").lower(),
+            webhook_url=getenv("WEBHOOK_URL", "").rstrip("/"),
+            webhook_path=getenv("WEBHOOK_PATH", "/webhook"),
+            webhook_secret=getenv("WEBHOOK_SECRET", ""),
+            webhook_host=getenv("WEBHOOK_HOST", "0.0.0.0"),
+            webhook_port=int(getenv("WEBHOOK_PORT", "8080")),
+            fsm_storage=getenv("FSM_STORAGE", "memory").lower(),
+            fsm_storage_path=getenv("FSM_STORAGE_PATH", "data/fsm.sqlite3"),
+            fsm_flush_interval=float(getenv("FSM_FLUSH_INTERVAL", "1")),
+            fsm_cache_ttl=float(getenv("FSM_CACHE_TTL", "30")),
+            redis_url=getenv("REDIS_URL", "redis://localhost:6379/0"),
+            metrics_host=getenv("METRICS_HOST", "0.0.0.0"),
+            metrics_port=int(getenv("METRICS_PORT", "9090")),
+            batch_window=float(getenv("BATCH_WINDOW", "1")),
+            batch_max_files=int(getenv("BATCH_MAX_FILES", "10")),
+            segment_workers=int(getenv("SEGMENT_WORKERS", "0")),
+            segment_min_duration=int(getenv("SEGMENT_MIN_DURATION", "20")),
+            sniff_kb=int(getenv("SNIFF_KB", "256")),
+            download_connections=int(getenv("DOWNLOAD_CONNECTIONS", "4")),
+            download_part_mb=int(getenv("DOWNLOAD_PART_MB", "2")),
+            throttle_user_rate=int(getenv("THROTTLE_USER_RATE", "30")),
+            throttle_chat_rate=int(getenv("THROTTLE_CHAT_RATE", "60")),
+            throttle_burst=int(getenv("THROTTLE_BURST", "10")),
+            max_pending_jobs=int(getenv("MAX_PENDING_JOBS", "10")),
+            throttle_max_keys=int(getenv("THROTTLE_MAX_KEYS", "100000")),
+            drain_timeout=int(getenv("DRAIN_TIMEOUT", "60")),
+            drain_state_path=getenv("DRAIN_STATE_PATH", "data/pending_jobs.jsonl"),
+            drop_pending_updates=getenv("DROP_PENDING_UPDATES", "0") == "1",
         )
 
 
@@ -17,6 +17,7 @@ router = Router()
 @router.callback_query(F.data == "mode_circle")
 async def callback_mode_circle(callback: CallbackQuery, state: FSMContext):
     await state.set_state(UserState.video_to_circle)
+    await state.update_data(start_offset=0)
     await callback.message.edit_text(CIRCLE_MODE_TEXT, reply_markup=get_mode_keyboard())
     await callback.answer()
 
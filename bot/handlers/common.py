@@ -0,0 +1,67 @@
+from functools import partial
+
+from aiogram import Bot
+from aiogram.types import Message
+
+from bot.services.batcher import batcher
+from bot.services.cache import result_cache
+from bot.services.job_queue import job_queue
+from bot.services.jobs import ConversionBatch, ConversionJob
+from bot.services.pipeline import admission_error, execute, job_cache_key, queue_text, reply, send_cached
+from bot.services.sniffer import needs_sniff, sniff_media
+from bot.utils.media_detect import MediaFile
+
+
+async def process_media(message: Message, bot: Bot, kind: str, media: MediaFile, start_offset: int = 0):
+    error = admission_error(kind, media, start_offset)
+    media_probe = None
+    if error is None and needs_sniff(media):
+        media, media_probe, error = await sniff_media(bot, kind, media)
+        error = error or admission_error(kind, media, start_offset)
+    if error is not None:
+        await message.reply(error)
+        return
+    
+    job = ConversionJob(
+        kind=kind,
+        user_id=message.from_user.id if message.from_user else message.chat.id,
+        chat_id=message.chat.id,
+        media=media,
+        reply_to_message_id=message.message_id,
+        start_offset=start_offset,
+        media_probe=media_probe
+    )
+    
+    window = batcher.window_for(message.media_group_id)
+    if window > 0:
+        batcher.add((job.chat_id, job.user_id), job, window, partial(submit_jobs, bot))
+        return
+    
+    await submit_jobs(bot, [job])
+
+
+async def submit_jobs(bot: Bot, jobs: list[ConversionJob]):
+    if len(jobs) == 1:
+        job = jobs[0]
+        key = job_cache_key(job)
+        cached = await result_cache.get(key)
+        if cached is not None:
+            if await send_cached(bot, job, cached):
+                return
+            await result_cache.delete(key)
+    else:
+        first = jobs[0]
+        job = ConversionBatch(
+            user_id=first.user_id,
+            chat_id=first.chat_id,
+            jobs=jobs,
+            reply_to_message_id=first.reply_to_message_id
+        )
+    
+    if job_queue is None:
+        await execute(bot, job)
+        return
+    
+    status = await reply(bot, job, queue_text(await job_queue.pending() + 1))
+    job.status_message_id = status.message_id
+    await job_queue.put(job)
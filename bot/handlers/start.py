@@ -1,14 +1,19 @@
 from aiogram import Router
-from aiogram.filters import CommandStart, Command
+from aiogram.filters import CommandStart, Command, CommandObject
 from aiogram.types import Message
 from aiogram.fsm.context import FSMContext
 
+from bot.config import config
 from bot.keyboards.main import get_main_keyboard, get_mode_keyboard
+from bot.services.batcher import batcher
+from bot.services.job_queue import job_queue
+from bot.services.registry import registry
 from bot.states import UserState
+from bot.utils.status import format_position
 
 router = Router()
 
-WELCOME_TEXT = """
+WELCOME_TEXT = f"""
 <b>Конвертер видео и аудио</b>
 
 Этот бот умеет:
@@ -20,10 +25,12 @@ WELCOME_TEXT = """
 Просто отправьте файл — видео станет кружком, аудио станет голосовым.
 
 <b>Ограничения:</b>
-• Максимальный размер файла: 20 МБ
+• Максимальный размер файла: {config.max_file_size // (1024 * 1024)} МБ
 • Максимальная длительность видео: 60 секунд
 • Видео длиннее 60 секунд будет обрезано
 
+/cancel — отменить текущую обработку
+
 Или выберите специальный режим:
 """
 
@@ -33,6 +40,7 @@ CIRCLE_MODE_TEXT = """
 Отправьте видеофайл (mp4, mov, avi, mkv, webm).
 
 Видео будет конвертировано в квадратный формат и отправлено как кружок.
+Чтобы взять фрагмент не с начала, укажите время: /circle 0:30
 
 Для возврата в автоматический режим нажмите "Сбросить режим".
 """
@@ -64,10 +72,33 @@ async def cmd_start(message: Message, state: FSMContext):
     await message.answer(WELCOME_TEXT, reply_markup=get_main_keyboard())
 
 
+def parse_timestamp(text: str) -> int | None:
+    parts = text.strip().split(":")
+    if not 1 <= len(parts) <= 3 or not all(part.isdigit() for part in parts):
+        return None
+    
+    seconds = 0
+    for part in parts:
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+
 @router.message(Command("circle"))
-async def cmd_circle(message: Message, state: FSMContext):
+async def cmd_circle(message: Message, state: FSMContext, command: CommandObject):
+    start_offset = 0
+    if command.args:
+        start_offset = parse_timestamp(command.args)
+        if start_offset is None:
+            await message.answer("Не понял время начала. Примеры: /circle 30, /circle 1:15, /circle 1:02:30")
+            return
+    
     await state.set_state(UserState.video_to_circle)
-    await message.answer(CIRCLE_MODE_TEXT, reply_markup=get_mode_keyboard())
+    await state.update_data(start_offset=start_offset)
+    
+    text = CIRCLE_MODE_TEXT
+    if start_offset:
+        text += f"\nНачало фрагмента: {format_position(start_offset)}\n"
+    await message.answer(text, reply_markup=get_mode_keyboard())
 
 
 @router.message(Command("voice"))
@@ -80,3 +111,24 @@ async def cmd_voice(message: Message, state: FSMContext):
 async def cmd_extract(message: Message, state: FSMContext):
     await state.set_state(UserState.video_to_audio)
     await message.answer(VIDEO_TO_AUDIO_MODE_TEXT, reply_markup=get_mode_keyboard())
+
+
+@router.message(Command("cancel"))
+async def cmd_cancel(message: Message):
+    cancelled = registry.cancel_user(message.from_user.id) + len(batcher.cancel_user(message.from_user.id))
+    if job_queue is not None:
+        removed, flagged = await job_queue.cancel_user(message.from_user.id)
+        for job in removed:
+            try:
+                await message.bot.edit_message_text(
+                    "Обработка отменена.",
+                    chat_id=job.chat_id,
+                    message_id=job.status_message_id
+                )
+            except Exception:
+                pass
+        cancelled = max(cancelled, flagged) + len(removed)
+    if cancelled:
+        await message.answer(f"Отменено задач: {cancelled}")
+    else:
+        await message.answer("Нет активных задач")
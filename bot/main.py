@@ -1,12 +1,20 @@
 import asyncio
+import hashlib
 import logging
+from aiohttp import web
 from aiogram import Bot, Dispatcher
-from aiogram.client.default import DefaultBotProperties
-from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 
 from bot.config import config
 from bot.handlers import start, video, audio, callbacks
+from bot.middlewares.throttling import throttling
+from bot.services.drain import drain
+from bot.services.fsm_storage import create_fsm_storage
+from bot.services.health import start_health_server
+from bot.services.job_queue import job_queue
+from bot.services.session import create_bot
+from bot.services.workers import WorkerPool, create_worker_pool
+from bot.utils.temp_file import temp_storage
 
 logging.basicConfig(
     level=logging.INFO,
@@ -15,24 +23,102 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def webhook_secret() -> str:
+    if config.webhook_secret:
+        return config.webhook_secret
+    return hashlib.sha256(config.bot_token.encode()).hexdigest()
+
+
+def keep_storage_open(dp: Dispatcher):
+    dp.shutdown.handlers = [handler for handler in dp.shutdown.handlers if handler.callback != dp.fsm.close]
+
+
+async def run_polling(bot: Bot, dp: Dispatcher):
+    await bot.delete_webhook(drop_pending_updates=config.drop_pending_updates)
+    polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False, close_bot_session=False))
+    stop = asyncio.create_task(drain.wait())
+    await asyncio.wait({polling, stop}, return_when=asyncio.FIRST_COMPLETED)
+    stop.cancel()
+    if not polling.done():
+        await dp.stop_polling()
+    await polling
+    await drain.confirm_updates(bot)
+
+
+async def run_webhook(bot: Bot, dp: Dispatcher, pool: WorkerPool | None):
+    secret = webhook_secret()
+    
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        handle_in_background=True,
+        secret_token=secret
+    ).register(app, path=config.webhook_path)
+    setup_application(app, dp, bot=bot)
+    
+    if config.webhook_url:
+        await bot.set_webhook(
+            f"{config.webhook_url}{config.webhook_path}",
+            secret_token=secret,
+            allowed_updates=dp.resolve_used_update_types()
+        )
+    
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, config.webhook_host, config.webhook_port)
+    await site.start()
+    logger.info("Webhook server listening on %s:%d%s", config.webhook_host, config.webhook_port, config.webhook_path)
+    
+    try:
+        await drain.wait()
+        await site.stop()
+        await drain.shutdown(pool)
+    finally:
+        await runner.cleanup()
+
+
 async def main():
-    bot = Bot(
-        token=config.bot_token,
-        default=DefaultBotProperties(parse_mode=ParseMode.HTML)
-    )
+    drain.install()
+    bot = create_bot()
     
-    storage = MemoryStorage()
+    storage = create_fsm_storage()
     dp = Dispatcher(storage=storage)
+    keep_storage_open(dp)
+    dp.update.outer_middleware(drain.track_updates)
+    dp.update.outer_middleware(throttling)
     
     dp.include_router(start.router)
     dp.include_router(callbacks.router)
     dp.include_router(video.router)
     dp.include_router(audio.router)
     
+    pool = None
+    if config.job_queue == "memory":
+        pool = create_worker_pool(bot)
+        pool.start()
+    health_server = await start_health_server(pool)
+    temp_storage.start_sweeper(config.temp_sweep_interval)
+    await drain.resume(bot)
+    
     logger.info("Bot starting...")
     
-    await bot.delete_webhook(drop_pending_updates=True)
-    await dp.start_polling(bot)
+    try:
+        if config.bot_mode == "webhook":
+            await run_webhook(bot, dp, pool)
+        else:
+            await run_polling(bot, dp)
+            await drain.shutdown(pool)
+    finally:
+        await temp_storage.stop_sweeper()
+        if health_server is not None:
+            await health_server.cleanup()
+        if pool is not None:
+            await pool.stop()
+        if job_queue is not None:
+            await job_queue.close()
+        await storage.close()
+        await bot.session.close()
 
 
 if __name__ == "__main__":
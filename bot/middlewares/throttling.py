@@ -0,0 +1,168 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.enums import ChatType
+from aiogram.types import Chat, Message, TelegramObject, Update, User
+
+from bot.config import config
+from bot.services.batcher import batcher
+from bot.services.job_queue import job_queue
+from bot.services.metrics import Counter, Gauge, metrics
+from bot.services.outbound import TokenBucket
+from bot.services.registry import registry
+
+logger = logging.getLogger(__name__)
+
+RATE_TEXT = "Слишком много сообщений. Подождите немного: пока лишние сообщения пропускаются."
+PENDING_TEXT = (
+    "Файлов в обработке: {count}. Дождитесь результата или отмените их командой /cancel: "
+    "пока новые файлы не принимаются."
+)
+
+REASON_RATE = "rate"
+REASON_PENDING = "pending"
+
+MEDIA_FIELDS = ("video", "video_note", "animation", "audio", "voice", "document")
+
+Handler = Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]]
+
+
+def media_message(event: TelegramObject) -> Message | None:
+    message = event.message if isinstance(event, Update) else None
+    if message is None or not any(getattr(message, name) for name in MEDIA_FIELDS):
+        return None
+    return message
+
+
+class Allowance(TokenBucket):
+    __slots__ = ("notified",)
+    
+    def __init__(self, rate: float, burst: float):
+        super().__init__(rate, burst)
+        self.notified = False
+
+
+class ExpiringBuckets:
+    
+    def __init__(self, per_minute: int, burst: int, max_keys: int):
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.max_keys = max(max_keys, 1)
+        self.ttl = max(burst, 1) / self.rate
+        self._buckets: OrderedDict[Hashable, Allowance] = OrderedDict()
+    
+    def __len__(self) -> int:
+        return len(self._buckets)
+    
+    def _expire(self, now: float):
+        while self._buckets:
+            key, bucket = next(iter(self._buckets.items()))
+            if len(self._buckets) < self.max_keys and now - bucket.updated_at < self.ttl:
+                break
+            del self._buckets[key]
+    
+    def get(self, key: Hashable, now: float) -> Allowance:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self._expire(now)
+            bucket = self._buckets[key] = Allowance(self.rate, self.burst)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    
+    def __init__(self, user_rate: int, chat_rate: int, burst: int, max_pending: int, max_keys: int):
+        self.users = ExpiringBuckets(user_rate, burst, max_keys) if user_rate > 0 else None
+        self.chats = ExpiringBuckets(chat_rate, burst, max_keys) if chat_rate > 0 else None
+        self.max_pending = max_pending
+        self._active: dict[int, int] = {}
+    
+    def tracked_keys(self) -> int:
+        return sum(len(buckets) for buckets in (self.users, self.chats) if buckets is not None)
+    
+    def _buckets(self, user: User, chat: Chat | None, now: float) -> list[Allowance]:
+        buckets = []
+        if self.users is not None:
+            buckets.append(self.users.get(user.id, now))
+        if self.chats is not None and chat is not None and chat.type != ChatType.PRIVATE:
+            buckets.append(self.chats.get(chat.id, now))
+        return buckets
+    
+    async def pending_jobs(self, user_id: int) -> int:
+        if job_queue is not None:
+            queued = self._active.get(user_id, 0) + await job_queue.user_pending(user_id)
+        else:
+            queued = max(self._active.get(user_id, 0), registry.user_jobs(user_id))
+        return queued + batcher.user_pending(user_id)
+    
+    async def _drop(self, bot: Bot, chat: Chat | None, allowance: Allowance, reason: str, text: str):
+        throttled_updates_total.inc(reason=reason)
+        if allowance.notified or chat is None:
+            return
+        
+        allowance.notified = True
+        try:
+            await bot.send_message(chat.id, text)
+        except Exception as e:
+            logger.info("Failed to send a throttling notice to %s: %s", chat.id, e)
+    
+    async def __call__(self, handler: Handler, event: TelegramObject, data: dict[str, Any]) -> Any:
+        user: User | None = data.get("event_from_user")
+        chat: Chat | None = data.get("event_chat")
+        if user is None:
+            return await handler(event, data)
+        
+        now = time.monotonic()
+        buckets = self._buckets(user, chat, now)
+        if buckets:
+            allowance = buckets[0]
+            if any(bucket.ready_at(now) > now for bucket in buckets):
+                await self._drop(data["bot"], chat, allowance, REASON_RATE, RATE_TEXT)
+                return None
+            for bucket in buckets:
+                bucket.take(now)
+        else:
+            allowance = Allowance(0, 1)
+        
+        if media_message(event) is None or self.max_pending <= 0:
+            allowance.notified = False
+            return await handler(event, data)
+        
+        pending = await self.pending_jobs(user.id)
+        if pending >= self.max_pending:
+            await self._drop(data["bot"], chat, allowance, REASON_PENDING, PENDING_TEXT.format(count=pending))
+            return None
+        
+        allowance.notified = False
+        self._active[user.id] = self._active.get(user.id, 0) + 1
+        try:
+            return await handler(event, data)
+        finally:
+            self._active[user.id] -= 1
+            if not self._active[user.id]:
+                del self._active[user.id]
+
+
+throttling = ThrottlingMiddleware(
+    config.throttle_user_rate,
+    config.throttle_chat_rate,
+    config.throttle_burst,
+    config.max_pending_jobs,
+    config.throttle_max_keys
+)
+
+throttled_updates_total = metrics.register(Counter(
+    "bot_throttled_updates_total",
+    "Updates dropped by the anti-flood middleware",
+    ("reason",)
+))
+throttle_tracked_keys = metrics.register(Gauge(
+    "bot_throttle_tracked_keys",
+    "Users and chats with a live anti-flood bucket",
+    collect=lambda: {(): throttling.tracked_keys()}
+))
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+from bot.config import config
+from bot.services.jobs import ConversionJob
+
+logger = logging.getLogger(__name__)
+
+MEDIA_GROUP_WINDOW = 0.5
+
+BatchKey = tuple[int, int]
+FlushCallback = Callable[[list[ConversionJob]], Awaitable[None]]
+
+
+@dataclass
+class PendingBatch:
+    flush: FlushCallback
+    jobs: list[ConversionJob] = field(default_factory=list)
+    timer: asyncio.TimerHandle | None = None
+
+
+class MediaBatcher:
+    
+    def __init__(self, window: float, max_files: int):
+        self.window = window
+        self.max_files = max_files
+        self._pending: dict[BatchKey, PendingBatch] = {}
+        self._tasks: set[asyncio.Task] = set()
+    
+    def window_for(self, media_group_id: str | None) -> float:
+        if media_group_id is not None:
+            return max(self.window, MEDIA_GROUP_WINDOW)
+        return self.window
+    
+    def add(self, key: BatchKey, job: ConversionJob, window: float, flush: FlushCallback):
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = self._pending[key] = PendingBatch(flush=flush)
+        batch.jobs.append(job)
+        
+        if batch.timer is not None:
+            batch.timer.cancel()
+        if len(batch.jobs) >= self.max_files:
+            self._flush(key)
+        else:
+            batch.timer = asyncio.get_running_loop().call_later(window, self._flush, key)
+    
+    def _flush(self, key: BatchKey):
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        
+        task = asyncio.create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _run(self, batch: PendingBatch):
+        try:
+            await batch.flush(batch.jobs)
+        except Exception:
+            logger.exception("Failed to process a batch of %d files", len(batch.jobs))
+    
+    def cancel_user(self, user_id: int) -> list[ConversionJob]:
+        removed = []
+        for key in [key for key in self._pending if key[1] == user_id]:
+            batch = self._pending.pop(key)
+            if batch.timer is not None:
+                batch.timer.cancel()
+            removed.extend(batch.jobs)
+        return removed
+    
+    def flush_all(self):
+        for key in list(self._pending):
+            self._flush(key)
+
+    @property
+    def busy(self) -> bool:
+        return bool(self._pending or self._tasks)
+    
+    def pending(self) -> int:
+        return sum(len(batch.jobs) for batch in self._pending.values())
+    
+    def user_pending(self, user_id: int) -> int:
+        return sum(len(batch.jobs) for key, batch in self._pending.items() if key[1] == user_id)
+
+
+batcher = MediaBatcher(config.batch_window, max(config.batch_max_files, 1))
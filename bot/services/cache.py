@@ -0,0 +1,179 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from pathlib import Path
+
+from bot.config import config
+from bot.services.metrics import Gauge, cache_hits_total, cache_misses_total, metrics
+
+
+@dataclass
+class CachedResult:
+    file_id: str
+    duration: int = 0
+    original_duration: int = 0
+    was_trimmed: bool = False
+
+
+class MemoryCacheBackend:
+    
+    def __init__(self, max_entries: int, ttl: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, CachedResult]] = OrderedDict()
+    
+    async def get(self, key: str) -> CachedResult | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        
+        self._entries.move_to_end(key)
+        return value
+    
+    async def set(self, key: str, value: CachedResult):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    async def delete(self, key: str):
+        self._entries.pop(key, None)
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    
+    def __init__(self, path: str, max_entries: int, ttl: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS results_used_at ON results (used_at)")
+        self._db.commit()
+        self._lock = asyncio.Lock()
+    
+    def _get(self, key: str) -> CachedResult | None:
+        now = time.time()
+        row = self._db.execute(
+            "SELECT value, expires_at FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        
+        value, expires_at = row
+        if expires_at < now:
+            self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+            self._db.commit()
+            return None
+        
+        self._db.execute("UPDATE results SET used_at = ? WHERE key = ?", (now, key))
+        self._db.commit()
+        return CachedResult(**json.loads(value))
+    
+    def _set(self, key: str, value: CachedResult):
+        now = time.time()
+        self._db.execute(
+            "INSERT OR REPLACE INTO results (key, value, expires_at, used_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(asdict(value)), now + self.ttl, now)
+        )
+        self._db.execute("DELETE FROM results WHERE expires_at < ?", (now,))
+        self._db.execute(
+            "DELETE FROM results WHERE key NOT IN "
+            "(SELECT key FROM results ORDER BY used_at DESC LIMIT ?)",
+            (self.max_entries,)
+        )
+        self._db.commit()
+    
+    def _delete(self, key: str):
+        self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+        self._db.commit()
+    
+    async def get(self, key: str) -> CachedResult | None:
+        async with self._lock:
+            return await asyncio.to_thread(self._get, key)
+    
+    async def set(self, key: str, value: CachedResult):
+        async with self._lock:
+            await asyncio.to_thread(self._set, key, value)
+    
+    async def delete(self, key: str):
+        async with self._lock:
+            await asyncio.to_thread(self._delete, key)
+    
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+class ResultCache:
+    
+    def __init__(self, backend: MemoryCacheBackend | SQLiteCacheBackend | None):
+        self.backend = backend
+
+    @staticmethod
+    def make_key(file_unique_id: str, kind: str, params: dict) -> str:
+        payload = json.dumps(params, sort_keys=True, separators=(",", ":"))
+        digest = hashlib.sha1(payload.encode()).hexdigest()[:16]
+        return f"{kind}:{file_unique_id}:{digest}"
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+    
+    async def get(self, key: str) -> CachedResult | None:
+        if self.backend is None:
+            return None
+        
+        value = await self.backend.get(key)
+        kind = key.split(":", 1)[0]
+        if value is None:
+            cache_misses_total.inc(kind=kind)
+        else:
+            cache_hits_total.inc(kind=kind)
+        return value
+    
+    async def set(self, key: str, value: CachedResult):
+        if self.backend is not None:
+            await self.backend.set(key, value)
+    
+    async def delete(self, key: str):
+        if self.backend is not None:
+            await self.backend.delete(key)
+    
+    def __len__(self) -> int:
+        return len(self.backend) if self.backend is not None else 0
+
+
+def create_result_cache() -> ResultCache:
+    if config.cache_backend == "sqlite":
+        backend = SQLiteCacheBackend(config.cache_path, config.cache_max_entries, config.cache_ttl)
+    elif config.cache_backend == "memory":
+        backend = MemoryCacheBackend(config.cache_max_entries, config.cache_ttl)
+    else:
+        backend = None
+    return ResultCache(backend)
+
+
+result_cache = create_result_cache()
+
+cache_entries = metrics.register(Gauge(
+    "bot_cache_entries",
+    "Results stored in the result cache",
+    collect=lambda: {(): len(result_cache)}
+))
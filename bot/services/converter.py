@@ -1,7 +1,161 @@
 import asyncio
-import json
-from dataclasses import dataclass
+import math
+import re
+import time
+from collections import deque
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable
+
+from bot.services.probe import MediaProbe, probe_bytes, probe_file
+from bot.services.profiles import EncoderProfile, DEFAULT_PROFILES, PROFILE_QUALITY
+from bot.services.supervisor import ProcessSupervisor
+from bot.utils.media_detect import may_contain_opus
+
+STREAM_CHUNK_SIZE = 64 * 1024
+STDERR_TAIL_LINES = 20
+
+DURATION_PATTERN = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+
+PROGRESS_KEYS = {
+    "frame",
+    "fps",
+    "bitrate",
+    "total_size",
+    "out_time_us",
+    "out_time_ms",
+    "out_time",
+    "dup_frames",
+    "drop_frames",
+    "speed",
+    "progress",
+}
+
+VIDEO_NOTE_ENCODER_ARGS = [
+    "-c:v", "libx264",
+    "-c:a", "aac",
+    "-movflags", "+faststart",
+    "-pix_fmt", "yuv420p",
+]
+
+VOICE_ENCODER_ARGS = [
+    "-c:a", "libopus",
+    "-b:a", "64k",
+    "-vbr", "on",
+    "-application", "voip",
+]
+VOICE_COMPRESSION_LEVEL = 10
+
+VOICE_COPY_CODECS = {"opus"}
+VOICE_COPY_MAX_CHANNELS = 2
+VOICE_COPY_SAMPLE_RATE = 48000
+VOICE_COPY_MAX_BITRATE = 128 * 1000
+
+
+COPY_VIDEO_CODECS = {"h264"}
+COPY_AUDIO_CODECS = {"aac"}
+COPY_PIXEL_FORMATS = {"yuv420p", "yuvj420p"}
+
+PLAN_ENCODE = "encode"
+PLAN_AUDIO_ONLY = "audio_only"
+PLAN_REMUX = "remux"
+
+SEGMENT_MIN_LENGTH = 5
+
+
+@dataclass
+class VideoNotePlan:
+    start: int = 0
+    duration: int = 0
+    copy_video: bool = False
+    copy_audio: bool = False
+
+    @property
+    def name(self) -> str:
+        if not self.copy_video:
+            return PLAN_ENCODE
+        return PLAN_REMUX if self.copy_audio else PLAN_AUDIO_ONLY
+    
+    def input_args(self) -> list[str]:
+        args = ["-ss", str(self.start)] if self.start else []
+        if self.duration:
+            args += ["-t", str(self.duration)]
+        return args
+
+
+def can_copy_video(media_probe: MediaProbe, size: int) -> bool:
+    video = media_probe.video
+    return (
+        video is not None
+        and video.codec_name in COPY_VIDEO_CODECS
+        and video.pix_fmt in COPY_PIXEL_FORMATS
+        and video.rotation == 0
+        and video.width == video.height
+        and 0 < video.width <= size
+    )
+
+
+def plan_video_note(media_probe: MediaProbe | None, size: int, max_duration: int, start: int = 0) -> VideoNotePlan:
+    plan = VideoNotePlan(start=start, duration=max_duration)
+    if media_probe is None or start or not 0 < media_probe.duration <= max_duration:
+        return plan
+    
+    plan.copy_video = can_copy_video(media_probe, size)
+    plan.copy_audio = plan.copy_video and (not media_probe.has_audio or media_probe.audio_codec in COPY_AUDIO_CODECS)
+    return plan
+
+
+def video_note_args(plan: VideoNotePlan, size: int, profile: EncoderProfile, threads: int = 0) -> list[str]:
+    if not plan.copy_video:
+        return [
+            "-vf", f"crop=min(iw\\,ih):min(iw\\,ih),scale={size}:{size}",
+            *video_note_encoder_args(profile, threads),
+        ]
+    
+    audio_args = ["-c:a", "copy"] if plan.copy_audio else ["-c:a", "aac", "-b:a", profile.audio_bitrate]
+    return ["-c:v", "copy", *audio_args, "-movflags", "+faststart"]
+
+
+def segment_bounds(start: int, duration: float, count: int) -> list[tuple[int, float]]:
+    length = math.ceil(duration / count)
+    bounds = []
+    for offset in range(0, math.ceil(duration), length):
+        bounds.append((start + offset, min(length, duration - offset)))
+    return bounds
+
+
+def concat_list(paths: list[str]) -> str:
+    return "".join(f"file '{Path(path).resolve()}'\n" for path in paths)
+
+
+def can_copy_voice(media_probe: MediaProbe | None) -> bool:
+    audio = media_probe.audio if media_probe is not None else None
+    if audio is None or audio.codec_name not in VOICE_COPY_CODECS:
+        return False
+    
+    bit_rate = audio.bit_rate or (0 if media_probe.has_video else media_probe.bit_rate)
+    return (
+        0 < audio.channels <= VOICE_COPY_MAX_CHANNELS
+        and audio.sample_rate in (0, VOICE_COPY_SAMPLE_RATE)
+        and bit_rate <= VOICE_COPY_MAX_BITRATE
+    )
+
+
+def voice_args(media_probe: MediaProbe | None, compression_level: int = VOICE_COMPRESSION_LEVEL) -> list[str]:
+    if can_copy_voice(media_probe):
+        return ["-vn", "-c:a", "copy"]
+    return [*VOICE_ENCODER_ARGS, "-compression_level", str(compression_level)]
+
+
+def video_note_encoder_args(profile: EncoderProfile, threads: int = 0) -> list[str]:
+    thread_args = ["-threads", str(threads)] if threads else []
+    return [
+        *VIDEO_NOTE_ENCODER_ARGS,
+        "-preset", profile.preset,
+        "-crf", str(profile.crf),
+        "-b:a", profile.audio_bitrate,
+        *thread_args,
+    ]
 
 
 @dataclass
@@ -11,81 +165,302 @@ class ConversionResult:
     original_duration: int = 0
     was_trimmed: bool = False
     error: str = ""
+    profile: str = ""
+    segments: int = 1
+    probe_time: float = 0.0
+    encode_time: float = 0.0
 
 
-class ConversionService:
+@dataclass
+class Progress:
+    out_time: float = 0.0
+    speed: float = 0.0
+    input_duration: int = 0
+    done: bool = False
+
+
+ProgressCallback = Callable[[Progress], Awaitable[None]]
+
+
+@dataclass
+class FFmpegOutput:
+    progress: dict[str, str] = field(default_factory=dict)
+    tail: deque[str] = field(default_factory=lambda: deque(maxlen=STDERR_TAIL_LINES))
+    input_duration: int = 0
+
+    @property
+    def duration(self) -> int:
+        return round(progress_seconds(self.progress))
+
+    @property
+    def error_text(self) -> str:
+        return "\n".join(self.tail) or "Unknown error"
+
+
+class ConversionError(Exception):
+    pass
+
+
+def _to_seconds(match: re.Match | None) -> int:
+    if match is None:
+        return 0
+    hours, minutes, seconds = match.groups()
+    return int(int(hours) * 3600 + int(minutes) * 60 + float(seconds))
+
+
+def parse_input_duration(stderr: str) -> int:
+    return _to_seconds(DURATION_PATTERN.search(stderr))
+
+
+def progress_seconds(progress: dict[str, str]) -> float:
+    try:
+        return int(progress.get("out_time_us", "0")) / 1_000_000
+    except ValueError:
+        return 0.0
+
+
+def progress_speed(progress: dict[str, str]) -> float:
+    try:
+        return float(progress.get("speed", "0").rstrip("x"))
+    except ValueError:
+        return 0.0
+
+
+def start_error(original_duration: int) -> str:
+    return f"Видео короче начала фрагмента: длительность {original_duration} с"
+
+
+def voice_error(error_text: str) -> str:
+    if "does not contain any stream" in error_text or "Output file is empty" in error_text:
+        return "Видео не содержит аудиодорожки"
+    return error_text[-500:]
+
+
+async def read_ffmpeg_output(
+    stream: asyncio.StreamReader,
+    on_progress: ProgressCallback | None = None
+) -> FFmpegOutput:
+    output = FFmpegOutput()
+    block: dict[str, str] = {}
     
-    async def get_media_duration(self, input_path: str) -> int:
-        cmd = [
-            "ffprobe",
-            "-v", "quiet",
-            "-print_format", "json",
-            "-show_format",
-            input_path
-        ]
+    async for raw_line in stream:
+        line = raw_line.decode(errors="replace").rstrip()
+        key, sep, value = line.partition("=")
         
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
+        if sep and (key in PROGRESS_KEYS or key.startswith("stream_")):
+            if value != "N/A":
+                block[key] = value
+            if key == "progress":
+                output.progress.update(block)
+                block = {}
+                if on_progress is not None:
+                    await on_progress(Progress(
+                        out_time=progress_seconds(output.progress),
+                        speed=progress_speed(output.progress),
+                        input_duration=output.input_duration,
+                        done=value == "end"
+                    ))
+            continue
         
-        stdout, _ = await process.communicate()
+        if not output.input_duration:
+            output.input_duration = parse_input_duration(line)
+        if line:
+            output.tail.append(line)
+    
+    return output
+
+
+async def feed_stdin(
+    process: asyncio.subprocess.Process,
+    chunks: AsyncIterator[bytes],
+    supervisor: ProcessSupervisor
+):
+    try:
+        async for chunk in chunks:
+            process.stdin.write(chunk)
+            await process.stdin.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+    except Exception:
+        supervisor.kill(process)
+        raise
+    finally:
+        if not process.stdin.is_closing():
+            process.stdin.close()
+
+
+class VoiceStream:
+    
+    def __init__(
+        self,
+        process: asyncio.subprocess.Process,
+        chunks: AsyncIterator[bytes],
+        supervisor: ProcessSupervisor,
+        on_progress: ProgressCallback | None = None
+    ):
+        self.process = process
+        self.supervisor = supervisor
+        self._feeder = asyncio.create_task(feed_stdin(process, chunks, supervisor))
+        self._stderr = asyncio.create_task(read_ffmpeg_output(process.stderr, on_progress))
+        self._result: ConversionResult | None = None
+        self._started_at = time.monotonic()
+    
+    async def read(self) -> AsyncIterator[bytes]:
+        while chunk := await self.process.stdout.read(STREAM_CHUNK_SIZE):
+            yield chunk
         
-        if process.returncode != 0:
-            return 0
+        result = await self.finish()
+        if not result.success:
+            raise ConversionError(result.error)
+    
+    async def finish(self) -> ConversionResult:
+        if self._result is not None:
+            return self._result
+        
+        while await self.process.stdout.read(STREAM_CHUNK_SIZE):
+            pass
+        output = await self._stderr
+        await self.process.wait()
         
         try:
-            data = json.loads(stdout.decode())
-            duration = float(data.get("format", {}).get("duration", 0))
-            return int(duration)
-        except (json.JSONDecodeError, ValueError, KeyError):
-            return 0
+            await self._feeder
+        except Exception as e:
+            self._result = ConversionResult(success=False, error=f"Download failed: {e}")
+            return self._result
+        
+        if self.process.returncode != 0:
+            self._result = ConversionResult(success=False, error=voice_error(output.error_text))
+        else:
+            self._result = ConversionResult(
+                success=True,
+                duration=output.duration,
+                encode_time=time.monotonic() - self._started_at
+            )
+        return self._result
+    
+    async def abort(self):
+        self.supervisor.kill(self.process)
+        self._feeder.cancel()
+        if self._result is None:
+            self._stderr.cancel()
+            self._result = ConversionResult(success=False, error="Aborted")
+
+
+class ConversionService:
+    
+    def __init__(self, supervisor: ProcessSupervisor | None = None):
+        self.supervisor = supervisor or ProcessSupervisor()
+    
+    async def probe(self, input_path: str) -> MediaProbe | None:
+        return await probe_file(input_path, self.supervisor)
+    
+    async def probe_head(self, head: bytes) -> MediaProbe | None:
+        return await probe_bytes(head, self.supervisor)
+    
+    async def probe_voice_input(self, input_path: str) -> MediaProbe | None:
+        if not may_contain_opus(Path(input_path).suffix.lower()):
+            return None
+        return await self.probe(input_path)
+    
+    async def spawn_ffmpeg(
+        self,
+        cmd: list[str],
+        stdin: int = asyncio.subprocess.DEVNULL,
+        stdout: int = asyncio.subprocess.DEVNULL
+    ) -> asyncio.subprocess.Process:
+        return await self.supervisor.spawn(
+            cmd[0],
+            "-hide_banner",
+            "-progress", "pipe:2",
+            "-nostats",
+            *cmd[1:],
+            stdin=stdin,
+            stdout=stdout,
+            stderr=asyncio.subprocess.PIPE
+        )
+    
+    async def run_ffmpeg(
+        self,
+        cmd: list[str],
+        on_progress: ProgressCallback | None = None
+    ) -> tuple[int, FFmpegOutput]:
+        process = await self.spawn_ffmpeg(cmd)
+        
+        try:
+            output = await read_ffmpeg_output(process.stderr, on_progress)
+            await process.wait()
+        except BaseException:
+            self.supervisor.kill(process)
+            raise
+        
+        return process.returncode, output
     
     async def convert_to_video_note(
         self,
         input_path: str,
         output_path: str,
         size: int,
-        max_duration: int
+        max_duration: int,
+        media_probe: MediaProbe | None = None,
+        profile: EncoderProfile = DEFAULT_PROFILES[PROFILE_QUALITY],
+        threads: int = 0,
+        on_progress: ProgressCallback | None = None,
+        start: int = 0,
+        segments: int = 1,
+        known_duration: int = 0
     ) -> ConversionResult:
         
-        original_duration = await self.get_media_duration(input_path)
-        was_trimmed = original_duration > max_duration
-        
-        duration_args = []
-        if was_trimmed:
-            duration_args = ["-t", str(max_duration)]
+        probe_time = 0.0
+        if media_probe is None:
+            started_at = time.monotonic()
+            media_probe = await self.probe(input_path)
+            probe_time = time.monotonic() - started_at
         
-        cmd = [
-            "ffmpeg",
-            "-y",
-            "-i", input_path,
-            *duration_args,
-            "-vf", f"crop=min(iw\\,ih):min(iw\\,ih),scale={size}:{size}",
-            "-c:v", "libx264",
-            "-preset", "medium",
-            "-crf", "23",
-            "-c:a", "aac",
-            "-b:a", "128k",
-            "-movflags", "+faststart",
-            "-pix_fmt", "yuv420p",
-            output_path
-        ]
+        original_duration = (int(media_probe.duration) if media_probe else 0) or known_duration
+        if original_duration and start >= original_duration:
+            return ConversionResult(
+                success=False,
+                error=start_error(original_duration),
+                probe_time=probe_time
+            )
+        was_trimmed = start > 0 or original_duration > max_duration
         
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
+        plan = plan_video_note(media_probe, size, max_duration, start)
+        encode_duration = min(original_duration - start, max_duration)
+        bounds = []
+        if plan.name == PLAN_ENCODE and segments > 1 and encode_duration >= SEGMENT_MIN_LENGTH * segments:
+            bounds = segment_bounds(start, encode_duration, segments)
         
-        _, stderr = await process.communicate()
+        started_at = time.monotonic()
+        if bounds:
+            returncode, output = await self._encode_segments(
+                input_path,
+                output_path,
+                plan,
+                size,
+                profile,
+                threads,
+                bounds,
+                on_progress
+            )
+        else:
+            cmd = [
+                "ffmpeg",
+                "-y",
+                *plan.input_args(),
+                "-i", input_path,
+                *video_note_args(plan, size, profile, threads),
+                output_path
+            ]
+            returncode, output = await self.run_ffmpeg(cmd, on_progress)
+        encode_time = time.monotonic() - started_at
         
-        if process.returncode != 0:
-            error_text = stderr.decode() if stderr else "Unknown error"
+        if returncode != 0:
             return ConversionResult(
                 success=False,
-                error=error_text[:500]
+                error=output.error_text[-500:],
+                probe_time=probe_time,
+                encode_time=encode_time
             )
         
         if not Path(output_path).exists():
@@ -94,46 +469,169 @@ class ConversionService:
                 error="Output file was not created"
             )
         
-        final_duration = await self.get_media_duration(output_path)
+        final_duration = min(output.duration, max_duration)
+        if not final_duration:
+            final_duration = min(original_duration - start, max_duration)
         
         return ConversionResult(
             success=True,
             duration=final_duration,
             original_duration=original_duration,
-            was_trimmed=was_trimmed
+            was_trimmed=was_trimmed,
+            profile=profile.name if plan.name == PLAN_ENCODE else plan.name,
+            segments=len(bounds) or 1,
+            probe_time=probe_time,
+            encode_time=encode_time
         )
     
+    async def _encode_segments(
+        self,
+        input_path: str,
+        output_path: str,
+        plan: VideoNotePlan,
+        size: int,
+        profile: EncoderProfile,
+        threads: int,
+        bounds: list[tuple[int, float]],
+        on_progress: ProgressCallback | None
+    ) -> tuple[int, FFmpegOutput]:
+        
+        output = Path(output_path)
+        parts = [str(output.with_name(f"{output.stem}_part{index}.mp4")) for index in range(len(bounds))]
+        list_path = output.with_name(f"{output.stem}_parts.txt")
+        done = [0.0] * len(bounds)
+        speeds = [0.0] * len(bounds)
+        
+        async def encode(index: int) -> tuple[int, FFmpegOutput]:
+            async def report(progress: Progress):
+                done[index] = progress.out_time
+                speeds[index] = 0.0 if progress.done else progress.speed
+                if on_progress is not None:
+                    await on_progress(Progress(
+                        out_time=sum(done),
+                        speed=sum(speeds),
+                        input_duration=progress.input_duration
+                    ))
+            
+            segment_start, length = bounds[index]
+            cmd = [
+                "ffmpeg",
+                "-y",
+                "-ss", str(segment_start),
+                "-i", input_path,
+                "-t", f"{length:.3f}",
+                *video_note_args(plan, size, profile, threads),
+                "-an",
+                parts[index]
+            ]
+            return await self.run_ffmpeg(cmd, report)
+        
+        try:
+            async with asyncio.TaskGroup() as group:
+                tasks = [group.create_task(encode(index)) for index in range(len(bounds))]
+            for returncode, segment_output in (task.result() for task in tasks):
+                if returncode != 0:
+                    return returncode, segment_output
+            
+            list_path.write_text(concat_list(parts))
+            cmd = [
+                "ffmpeg",
+                "-y",
+                "-f", "concat",
+                "-safe", "0",
+                "-i", str(list_path),
+                *plan.input_args(),
+                "-i", input_path,
+                "-map", "0:v",
+                "-map", "1:a?",
+                "-c:v", "copy",
+                "-c:a", "aac",
+                "-b:a", profile.audio_bitrate,
+                "-movflags", "+faststart",
+                output_path
+            ]
+            return await self.run_ffmpeg(cmd)
+        finally:
+            for path in [*parts, str(list_path)]:
+                Path(path).unlink(missing_ok=True)
+    
     async def convert_to_voice(
         self,
         input_path: str,
-        output_path: str
+        output_path: str,
+        media_probe: MediaProbe | None = None,
+        on_progress: ProgressCallback | None = None,
+        compression_level: int = VOICE_COMPRESSION_LEVEL
     ) -> ConversionResult:
         
+        probe_time = 0.0
+        if media_probe is None:
+            started_at = time.monotonic()
+            media_probe = await self.probe_voice_input(input_path)
+            probe_time = time.monotonic() - started_at
+        
         cmd = [
             "ffmpeg",
             "-y",
             "-i", input_path,
-            "-c:a", "libopus",
-            "-b:a", "64k",
-            "-vbr", "on",
-            "-compression_level", "10",
-            "-application", "voip",
+            *voice_args(media_probe, compression_level),
             output_path
         ]
         
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
+        return await self._encode_voice(cmd, output_path, media_probe, on_progress, probe_time)
+    
+    async def extract_audio_from_video(
+        self,
+        input_path: str,
+        output_path: str,
+        media_probe: MediaProbe | None = None,
+        on_progress: ProgressCallback | None = None,
+        compression_level: int = VOICE_COMPRESSION_LEVEL
+    ) -> ConversionResult:
         
-        _, stderr = await process.communicate()
+        probe_time = 0.0
+        if media_probe is None:
+            started_at = time.monotonic()
+            media_probe = await self.probe_voice_input(input_path)
+            probe_time = time.monotonic() - started_at
         
-        if process.returncode != 0:
-            error_text = stderr.decode() if stderr else "Unknown error"
+        if media_probe is not None and not media_probe.has_audio:
+            return ConversionResult(
+                success=False,
+                error="Видео не содержит аудиодорожки",
+                probe_time=probe_time
+            )
+        
+        cmd = [
+            "ffmpeg",
+            "-y",
+            "-i", input_path,
+            "-vn",
+            *voice_args(media_probe, compression_level),
+            output_path
+        ]
+        
+        return await self._encode_voice(cmd, output_path, media_probe, on_progress, probe_time)
+    
+    async def _encode_voice(
+        self,
+        cmd: list[str],
+        output_path: str,
+        media_probe: MediaProbe | None,
+        on_progress: ProgressCallback | None,
+        probe_time: float = 0.0
+    ) -> ConversionResult:
+        
+        started_at = time.monotonic()
+        returncode, output = await self.run_ffmpeg(cmd, on_progress)
+        encode_time = time.monotonic() - started_at
+        
+        if returncode != 0:
             return ConversionResult(
                 success=False,
-                error=error_text[:500]
+                error=voice_error(output.error_text),
+                probe_time=probe_time,
+                encode_time=encode_time
             )
         
         if not Path(output_path).exists():
@@ -142,50 +640,65 @@ class ConversionService:
                 error="Output file was not created"
             )
         
-        duration = await self.get_media_duration(output_path)
+        duration = output.duration
+        if not duration and media_probe is not None:
+            duration = int(media_probe.duration)
         
         return ConversionResult(
             success=True,
-            duration=duration
+            duration=duration,
+            profile=PLAN_REMUX if can_copy_voice(media_probe) else "",
+            probe_time=probe_time,
+            encode_time=encode_time
         )
     
-    async def extract_audio_from_video(
+    async def convert_to_video_note_stream(
         self,
-        input_path: str,
-        output_path: str
+        input_chunks: AsyncIterator[bytes],
+        output_path: str,
+        size: int,
+        max_duration: int,
+        known_duration: int = 0,
+        profile: EncoderProfile = DEFAULT_PROFILES[PROFILE_QUALITY],
+        threads: int = 0,
+        on_progress: ProgressCallback | None = None,
+        start: int = 0
     ) -> ConversionResult:
         
+        plan = VideoNotePlan(start=start, duration=max_duration)
         cmd = [
             "ffmpeg",
             "-y",
-            "-i", input_path,
-            "-vn",
-            "-c:a", "libopus",
-            "-b:a", "64k",
-            "-vbr", "on",
-            "-compression_level", "10",
-            "-application", "voip",
+            *plan.input_args(),
+            "-i", "pipe:0",
+            *video_note_args(plan, size, profile, threads),
             output_path
         ]
         
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
+        process = await self.spawn_ffmpeg(cmd, stdin=asyncio.subprocess.PIPE)
         
-        _, stderr = await process.communicate()
+        started_at = time.monotonic()
+        feeder = asyncio.create_task(feed_stdin(process, input_chunks, self.supervisor))
+        try:
+            output = await read_ffmpeg_output(process.stderr, on_progress)
+            await process.wait()
+        except BaseException:
+            self.supervisor.kill(process)
+            feeder.cancel()
+            raise
+        
+        try:
+            await feeder
+        except Exception as e:
+            return ConversionResult(
+                success=False,
+                error=f"Download failed: {e}"
+            )
         
         if process.returncode != 0:
-            error_text = stderr.decode() if stderr else "Unknown error"
-            if "does not contain any stream" in error_text or "Output file is empty" in error_text:
-                return ConversionResult(
-                    success=False,
-                    error="Видео не содержит аудиодорожки"
-                )
             return ConversionResult(
                 success=False,
-                error=error_text[:500]
+                error=output.error_text[-500:]
             )
         
         if not Path(output_path).exists():
@@ -194,9 +707,44 @@ class ConversionService:
                 error="Output file was not created"
             )
         
-        duration = await self.get_media_duration(output_path)
+        original_duration = known_duration or output.input_duration
+        if not output.duration and original_duration and start >= original_duration:
+            return ConversionResult(
+                success=False,
+                error=start_error(original_duration)
+            )
         
         return ConversionResult(
             success=True,
-            duration=duration
+            duration=min(output.duration, max_duration),
+            original_duration=original_duration,
+            was_trimmed=start > 0 or original_duration > max_duration,
+            profile=profile.name,
+            encode_time=time.monotonic() - started_at
         )
+    
+    async def open_voice_stream(
+        self,
+        input_chunks: AsyncIterator[bytes],
+        video_input: bool = False,
+        on_progress: ProgressCallback | None = None,
+        media_probe: MediaProbe | None = None,
+        compression_level: int = VOICE_COMPRESSION_LEVEL
+    ) -> VoiceStream:
+        
+        cmd = [
+            "ffmpeg",
+            "-i", "pipe:0",
+            *(["-vn"] if video_input else []),
+            *voice_args(media_probe, compression_level),
+            "-f", "ogg",
+            "pipe:1"
+        ]
+        
+        process = await self.spawn_ffmpeg(
+            cmd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE
+        )
+        
+        return VoiceStream(process, input_chunks, self.supervisor, on_progress)
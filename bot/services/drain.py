@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import os
+import signal
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from aiogram import Bot
+from aiogram.types import TelegramObject, Update
+
+from bot.config import config
+from bot.services.batcher import batcher
+from bot.services.job_queue import MemoryJobQueue, job_queue
+from bot.services.jobs import Job, load_job
+from bot.services.pipeline import execute, supervisor
+from bot.services.registry import ActiveJob, registry
+from bot.services.workers import WorkerPool
+from bot.utils.temp_file import temp_storage
+
+logger = logging.getLogger(__name__)
+
+DRAIN_POLL_INTERVAL = 0.5
+INTERRUPT_TIMEOUT = 10.0
+
+
+class Drain:
+    
+    def __init__(self, timeout: int, state_path: str):
+        self.timeout = timeout
+        self.state_path = Path(state_path)
+        self.draining = False
+        self.last_update_id: int | None = None
+        self._requested = asyncio.Event()
+        self._tasks: set[asyncio.Task] = set()
+        self._updates = 0
+    
+    def install(self):
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, self.request)
+    
+    def request(self):
+        if not self.draining:
+            logger.info("Shutdown requested, draining for up to %ds", self.timeout)
+        self.draining = True
+        self._requested.set()
+    
+    async def wait(self):
+        await self._requested.wait()
+    
+    async def track_updates(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any]
+    ) -> Any:
+        if isinstance(event, Update):
+            self.last_update_id = max(self.last_update_id or 0, event.update_id)
+        self._updates += 1
+        try:
+            return await handler(event, data)
+        finally:
+            self._updates -= 1
+    
+    async def confirm_updates(self, bot: Bot):
+        if self.last_update_id is not None:
+            await bot.get_updates(offset=self.last_update_id + 1, limit=1, timeout=0)
+    
+    def busy(self, pool: WorkerPool | None) -> bool:
+        return bool(
+            len(registry)
+            or batcher.busy
+            or self._tasks
+            or self._updates
+            or (pool is not None and pool.busy)
+        )
+    
+    async def hand_over_waiting(self) -> list[Job]:
+        waiting = registry.interrupt_all(waiting_only=True)
+        if waiting:
+            await asyncio.wait({job.task for job in waiting}, timeout=INTERRUPT_TIMEOUT)
+        return self._handed_over(waiting)
+    
+    async def wait_idle(self, pool: WorkerPool | None, pending: list[Job]) -> bool:
+        deadline = time.monotonic() + self.timeout
+        while True:
+            pending += await self.hand_over_waiting()
+            if not self.busy(pool):
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(DRAIN_POLL_INTERVAL)
+    
+    async def interrupt(self, pool: WorkerPool | None) -> list[Job]:
+        active = registry.interrupt_all()
+        tasks = {job.task for job in active} | self._tasks
+        for task in self._tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks, timeout=INTERRUPT_TIMEOUT)
+        if pool is not None:
+            await pool.stop()
+        return self._handed_over(active)
+    
+    def _handed_over(self, active: list[ActiveJob]) -> list[Job]:
+        if job_queue is not None:
+            return []
+        return [job.job for job in active if job.job is not None]
+    
+    async def shutdown(self, pool: WorkerPool | None):
+        self.request()
+        started_at = time.monotonic()
+        batcher.flush_all()
+        if pool is not None:
+            pool.pause()
+        
+        pending = []
+        if not await self.wait_idle(pool, pending):
+            logger.warning("Drain timed out after %ds with %d jobs running", self.timeout, len(registry))
+            pending += await self.interrupt(pool)
+        
+        supervisor.kill_all()
+        temp_storage.release_all()
+        
+        if isinstance(job_queue, MemoryJobQueue):
+            pending += job_queue.take_all()
+        self.save(pending)
+        logger.info("Drained in %.1fs, %d jobs handed over", time.monotonic() - started_at, len(pending))
+    
+    def save(self, jobs: list[Job]):
+        if not jobs:
+            return
+        
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.state_path.with_name(self.state_path.name + ".tmp")
+        with open(temp_path, "w") as f:
+            for job in jobs:
+                f.write(job.to_json() + "\n")
+        os.replace(temp_path, self.state_path)
+    
+    def load(self) -> list[Job]:
+        try:
+            lines = self.state_path.read_text().splitlines()
+        except FileNotFoundError:
+            return []
+        
+        jobs = []
+        for line in lines:
+            try:
+                jobs.append(load_job(line))
+            except Exception as e:
+                logger.warning("Skipping unreadable handed over job: %s", e)
+        self.state_path.unlink(missing_ok=True)
+        return jobs
+    
+    async def resume(self, bot: Bot):
+        jobs = self.load()
+        if not jobs:
+            return
+        
+        logger.info("Resuming %d jobs handed over by the previous instance", len(jobs))
+        for job in jobs:
+            if job_queue is not None:
+                await job_queue.put(job)
+                continue
+            task = asyncio.create_task(execute(bot, job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+
+drain = Drain(config.drain_timeout, config.drain_state_path)
@@ -0,0 +1,152 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from bot.config import config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StorageRecord:
+    state: str | None = None
+    data: dict[str, Any] = field(default_factory=dict)
+    loaded_at: float = 0.0
+
+
+class SQLiteStorage(BaseStorage):
+    
+    def __init__(self, path: str, flush_interval: float, cache_ttl: float):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.cache_ttl = cache_ttl
+        self.key_builder = DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS fsm ("
+            "key TEXT PRIMARY KEY, state TEXT, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._db.commit()
+        self._cache: dict[str, StorageRecord] = {}
+        self._dirty: set[str] = set()
+        self._lock = asyncio.Lock()
+        self._flush_task: asyncio.Task | None = None
+    
+    def _load(self, key: str) -> StorageRecord:
+        row = self._db.execute("SELECT state, data FROM fsm WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return StorageRecord(loaded_at=time.monotonic())
+        state, data = row
+        return StorageRecord(state=state, data=json.loads(data), loaded_at=time.monotonic())
+    
+    async def _record(self, key: StorageKey) -> tuple[str, StorageRecord]:
+        name = self.key_builder.build(key)
+        record = self._cache.get(name)
+        if record is not None and (name in self._dirty or time.monotonic() - record.loaded_at < self.cache_ttl):
+            return name, record
+        
+        async with self._lock:
+            record = await asyncio.to_thread(self._load, name)
+        if name in self._dirty:
+            return name, self._cache[name]
+        self._cache[name] = record
+        return name, record
+    
+    def _mark_dirty(self, name: str):
+        self._dirty.add(name)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+    
+    async def _flush_later(self):
+        try:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+        except Exception as e:
+            logger.warning("FSM storage flush failed: %s", e)
+        finally:
+            if self._flush_task is asyncio.current_task():
+                self._flush_task = None
+    
+    def _write(self, rows: list[tuple[str, str | None, str]]):
+        now = time.time()
+        with self._db:
+            for name, state, data in rows:
+                if state is None and data == "{}":
+                    self._db.execute("DELETE FROM fsm WHERE key = ?", (name,))
+                else:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO fsm (key, state, data, updated_at) VALUES (?, ?, ?, ?)",
+                        (name, state, data, now)
+                    )
+    
+    async def flush(self):
+        if not self._dirty:
+            return
+        
+        names, self._dirty = self._dirty, set()
+        rows = []
+        for name in names:
+            record = self._cache[name]
+            rows.append((name, record.state, json.dumps(record.data)))
+            record.loaded_at = time.monotonic()
+        
+        try:
+            async with self._lock:
+                await asyncio.to_thread(self._write, rows)
+        except BaseException:
+            self._dirty |= names
+            raise
+        
+        if len(self._cache) > 4096:
+            now = time.monotonic()
+            for name, record in list(self._cache.items()):
+                if name not in self._dirty and now - record.loaded_at >= self.cache_ttl:
+                    del self._cache[name]
+    
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        name, record = await self._record(key)
+        record.state = state.state if isinstance(state, State) else state
+        self._mark_dirty(name)
+    
+    async def get_state(self, key: StorageKey) -> str | None:
+        _, record = await self._record(key)
+        return record.state
+    
+    async def set_data(self, key: StorageKey, data: dict[str, Any]) -> None:
+        name, record = await self._record(key)
+        record.data = data.copy()
+        self._mark_dirty(name)
+    
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        _, record = await self._record(key)
+        return record.data.copy()
+    
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+        self._db.close()
+
+
+def create_fsm_storage() -> BaseStorage:
+    if config.fsm_storage == "sqlite":
+        return SQLiteStorage(config.fsm_storage_path, config.fsm_flush_interval, config.fsm_cache_ttl)
+    if config.fsm_storage == "redis":
+        try:
+            from aiogram.fsm.storage.redis import RedisStorage
+        except ImportError as e:
+            raise ValueError("FSM_STORAGE=redis requires the redis package: pip install redis") from e
+        return RedisStorage.from_url(config.redis_url)
+    return MemoryStorage()
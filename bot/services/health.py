@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import time
+
+from aiohttp import web
+
+from bot.config import config
+from bot.services.drain import drain
+from bot.services.job_queue import job_queue
+from bot.services.metrics import Gauge, metrics
+from bot.services.pipeline import supervisor
+from bot.services.registry import registry
+from bot.services.scheduler import scheduler
+from bot.services.workers import WorkerPool
+from bot.utils.temp_file import temp_storage
+
+logger = logging.getLogger(__name__)
+
+FFMPEG_CHECK_INTERVAL = 30.0
+FFMPEG_CHECK_TIMEOUT = 5.0
+
+
+lane_slots = metrics.register(Gauge(
+    "bot_lane_slots",
+    "Concurrent jobs allowed per scheduler lane",
+    ("lane",),
+    collect=lambda: {(name,): lane.slots for name, lane in scheduler.lanes.items()}
+))
+lane_running = metrics.register(Gauge(
+    "bot_lane_running",
+    "Jobs currently holding a scheduler slot",
+    ("lane",),
+    collect=lambda: {(name,): scheduler.running(name) for name in scheduler.lanes}
+))
+lane_queue_depth = metrics.register(Gauge(
+    "bot_lane_queue_depth",
+    "Jobs waiting for a scheduler slot",
+    ("lane",),
+    collect=lambda: {(name,): scheduler.queue_depth(name) for name in scheduler.lanes}
+))
+job_queue_pending = metrics.register(Gauge(
+    "bot_job_queue_pending",
+    "Jobs waiting in the worker job queue"
+))
+active_jobs = metrics.register(Gauge(
+    "bot_active_jobs",
+    "Jobs being processed by this process",
+    collect=lambda: {(): len(registry)}
+))
+ffmpeg_processes = metrics.register(Gauge(
+    "bot_ffmpeg_processes",
+    "Running ffmpeg and ffprobe processes",
+    collect=lambda: {(): len(supervisor.running)}
+))
+temp_dir_bytes = metrics.register(Gauge(
+    "bot_temp_dir_bytes",
+    "Bytes used by files in the temp directory",
+    collect=lambda: {(): temp_storage.usage()}
+))
+temp_reserved_bytes = metrics.register(Gauge(
+    "bot_temp_reserved_bytes",
+    "Temp space currently reserved by running jobs",
+    collect=lambda: {(): temp_storage.reserved}
+))
+temp_high_water_bytes = metrics.register(Gauge(
+    "bot_temp_high_water_bytes",
+    "Highest temp space reserved at once since start",
+    collect=lambda: {(): temp_storage.high_water}
+))
+temp_quota_bytes = metrics.register(Gauge(
+    "bot_temp_quota_bytes",
+    "Temp space quota, 0 when unlimited",
+    collect=lambda: {(): temp_storage.quota}
+))
+
+
+class HealthCheck:
+    
+    def __init__(self, pool: WorkerPool | None = None):
+        self.pool = pool
+        self._ffmpeg_ok = False
+        self._ffmpeg_checked_at = 0.0
+    
+    async def _check_ffmpeg(self) -> bool:
+        if time.monotonic() - self._ffmpeg_checked_at < FFMPEG_CHECK_INTERVAL:
+            return self._ffmpeg_ok
+        
+        try:
+            process = await supervisor.spawn(
+                "ffmpeg", "-hide_banner", "-version",
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+            try:
+                async with asyncio.timeout(FFMPEG_CHECK_TIMEOUT):
+                    ok = await process.wait() == 0
+            except TimeoutError:
+                supervisor.kill(process)
+                ok = False
+        except OSError as e:
+            logger.warning("ffmpeg check failed: %s", e)
+            ok = False
+        
+        self._ffmpeg_ok = ok
+        self._ffmpeg_checked_at = time.monotonic()
+        return ok
+    
+    async def _check_queue(self) -> bool:
+        if job_queue is None:
+            return True
+        try:
+            job_queue_pending.set(await job_queue.pending())
+        except Exception as e:
+            logger.warning("Job queue check failed: %s", e)
+            return False
+        return True
+    
+    async def status(self) -> dict[str, bool]:
+        checks = {
+            "accepting": not drain.draining,
+            "ffmpeg": await self._check_ffmpeg(),
+            "queue": await self._check_queue(),
+        }
+        if self.pool is not None:
+            checks["workers"] = self.pool.alive
+        return checks
+    
+    async def handle_ready(self, request: web.Request) -> web.Response:
+        checks = await self.status()
+        ready = all(checks.values())
+        return web.json_response({"ready": ready, **checks}, status=200 if ready else 503)
+    
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        await self._check_queue()
+        return web.Response(text=metrics.render(), content_type="text/plain", charset="utf-8")
+
+
+async def start_health_server(pool: WorkerPool | None = None) -> web.AppRunner | None:
+    if not config.metrics_port:
+        return None
+    
+    health = HealthCheck(pool)
+    app = web.Application()
+    app.router.add_get("/metrics", health.handle_metrics)
+    app.router.add_get("/ready", health.handle_ready)
+    
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, config.metrics_host, config.metrics_port).start()
+    logger.info("Metrics server listening on %s:%d", config.metrics_host, config.metrics_port)
+    return runner
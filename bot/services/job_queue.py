@@ -0,0 +1,237 @@
+import asyncio
+import dataclasses
+import sqlite3
+import time
+from pathlib import Path
+
+from bot.config import config
+from bot.services.jobs import Job, load_job
+
+POLL_INTERVAL = 0.5
+
+
+class MemoryJobQueue:
+    
+    def __init__(self, lease_timeout: int):
+        self.lease_timeout = lease_timeout
+        self._pending: list[Job] = []
+        self._leased: dict[str, tuple[float, Job]] = {}
+        self._cancelled: set[str] = set()
+        self._changed = asyncio.Event()
+    
+    def _requeue_expired(self):
+        now = time.monotonic()
+        for job_id, (leased_until, job) in list(self._leased.items()):
+            if leased_until < now:
+                del self._leased[job_id]
+                if job_id in self._cancelled:
+                    self._cancelled.discard(job_id)
+                else:
+                    self._pending.append(job)
+        self._pending.sort(key=lambda job: job.created_at)
+    
+    async def put(self, job: Job):
+        self._pending.append(job)
+        self._changed.set()
+    
+    async def get(self) -> Job:
+        while True:
+            self._requeue_expired()
+            if self._pending:
+                job = self._pending.pop(0)
+                job = dataclasses.replace(job, attempts=job.attempts + 1)
+                self._leased[job.job_id] = (time.monotonic() + self.lease_timeout, job)
+                return job
+            
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), POLL_INTERVAL)
+            except TimeoutError:
+                pass
+    
+    def _holds(self, job: Job) -> bool:
+        entry = self._leased.get(job.job_id)
+        return entry is not None and entry[1].attempts == job.attempts
+    
+    async def touch(self, job: Job) -> bool:
+        if not self._holds(job) or job.job_id in self._cancelled:
+            return False
+        self._leased[job.job_id] = (time.monotonic() + self.lease_timeout, job)
+        return True
+    
+    async def cancelled_ids(self, job_ids: list[str]) -> set[str]:
+        return {job_id for job_id in job_ids if job_id in self._cancelled}
+    
+    async def ack(self, job: Job):
+        if not self._holds(job):
+            return
+        del self._leased[job.job_id]
+        self._cancelled.discard(job.job_id)
+    
+    async def release(self, job: Job):
+        if not self._holds(job):
+            return
+        del self._leased[job.job_id]
+        if job.job_id in self._cancelled:
+            self._cancelled.discard(job.job_id)
+            return
+        self._pending.insert(0, job)
+        self._changed.set()
+    
+    def take_all(self) -> list[Job]:
+        self._requeue_expired()
+        jobs = [job for job in self._pending if job.job_id not in self._cancelled]
+        jobs += [job for job_id, (_, job) in self._leased.items() if job_id not in self._cancelled]
+        self._pending = []
+        self._leased = {}
+        self._cancelled = set()
+        return sorted(jobs, key=lambda job: job.created_at)
+    
+    async def cancel_user(self, user_id: int) -> tuple[list[Job], int]:
+        removed = [job for job in self._pending if job.user_id == user_id]
+        self._pending = [job for job in self._pending if job.user_id != user_id]
+        
+        flagged = 0
+        for _, job in self._leased.values():
+            if job.user_id == user_id and job.job_id not in self._cancelled:
+                self._cancelled.add(job.job_id)
+                flagged += 1
+        return removed, flagged
+    
+    async def pending(self) -> int:
+        return len(self._pending)
+    
+    async def user_pending(self, user_id: int) -> int:
+        queued = sum(1 for job in self._pending if job.user_id == user_id)
+        return queued + sum(1 for _, job in self._leased.values() if job.user_id == user_id)
+    
+    async def close(self):
+        pass
+
+
+class SQLiteJobQueue:
+    
+    def __init__(self, path: str, lease_timeout: int):
+        self.path = path
+        self.lease_timeout = lease_timeout
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "job_id TEXT PRIMARY KEY, user_id INTEGER NOT NULL, payload TEXT NOT NULL, "
+            "created_at REAL NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "leased_until REAL NOT NULL DEFAULT 0, cancelled INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_created_at ON jobs (created_at)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_user_id ON jobs (user_id)")
+        self._lock = asyncio.Lock()
+    
+    def _run(self, sql: str, params: tuple) -> tuple[list, int]:
+        cursor = self._db.execute(sql, params)
+        return cursor.fetchall(), cursor.rowcount
+    
+    async def _execute(self, sql: str, params: tuple = ()) -> tuple[list, int]:
+        async with self._lock:
+            return await asyncio.to_thread(self._run, sql, params)
+    
+    async def put(self, job: Job):
+        await self._execute(
+            "INSERT INTO jobs (job_id, user_id, payload, created_at) VALUES (?, ?, ?, ?)",
+            (job.job_id, job.user_id, job.to_json(), job.created_at)
+        )
+    
+    def _lease(self) -> Job | None:
+        now = time.time()
+        self._db.execute("DELETE FROM jobs WHERE cancelled = 1 AND leased_until < ?", (now,))
+        row = self._db.execute(
+            "UPDATE jobs SET attempts = attempts + 1, leased_until = ? "
+            "WHERE job_id = (SELECT job_id FROM jobs WHERE leased_until < ? AND cancelled = 0 "
+            "ORDER BY created_at LIMIT 1) "
+            "RETURNING payload, attempts",
+            (now + self.lease_timeout, now)
+        ).fetchone()
+        if row is None:
+            return None
+        
+        payload, attempts = row
+        job = load_job(payload)
+        job.attempts = attempts
+        return job
+    
+    async def get(self) -> Job:
+        while True:
+            async with self._lock:
+                job = await asyncio.to_thread(self._lease)
+            if job is not None:
+                return job
+            await asyncio.sleep(POLL_INTERVAL)
+    
+    async def touch(self, job: Job) -> bool:
+        _, updated = await self._execute(
+            "UPDATE jobs SET leased_until = ? WHERE job_id = ? AND attempts = ? AND cancelled = 0",
+            (time.time() + self.lease_timeout, job.job_id, job.attempts)
+        )
+        return updated > 0
+    
+    async def cancelled_ids(self, job_ids: list[str]) -> set[str]:
+        if not job_ids:
+            return set()
+        rows, _ = await self._execute(
+            f"SELECT job_id FROM jobs WHERE cancelled = 1 AND job_id IN ({', '.join('?' * len(job_ids))})",
+            tuple(job_ids)
+        )
+        return {job_id for job_id, in rows}
+    
+    async def ack(self, job: Job):
+        await self._execute(
+            "DELETE FROM jobs WHERE job_id = ? AND attempts = ?",
+            (job.job_id, job.attempts)
+        )
+    
+    async def release(self, job: Job):
+        await self._execute(
+            "UPDATE jobs SET leased_until = 0 WHERE job_id = ? AND attempts = ?",
+            (job.job_id, job.attempts)
+        )
+    
+    async def cancel_user(self, user_id: int) -> tuple[list[Job], int]:
+        now = time.time()
+        rows, _ = await self._execute(
+            "DELETE FROM jobs WHERE user_id = ? AND leased_until < ? RETURNING payload",
+            (user_id, now)
+        )
+        _, flagged = await self._execute(
+            "UPDATE jobs SET cancelled = 1 WHERE user_id = ? AND cancelled = 0",
+            (user_id,)
+        )
+        return [load_job(payload) for payload, in rows], flagged
+    
+    async def pending(self) -> int:
+        rows, _ = await self._execute(
+            "SELECT COUNT(*) FROM jobs WHERE leased_until < ? AND cancelled = 0",
+            (time.time(),)
+        )
+        return rows[0][0]
+    
+    async def user_pending(self, user_id: int) -> int:
+        rows, _ = await self._execute(
+            "SELECT COUNT(*) FROM jobs WHERE user_id = ? AND cancelled = 0",
+            (user_id,)
+        )
+        return rows[0][0]
+    
+    async def close(self):
+        async with self._lock:
+            self._db.close()
+
+
+def create_job_queue() -> MemoryJobQueue | SQLiteJobQueue | None:
+    if config.job_queue == "sqlite":
+        return SQLiteJobQueue(config.job_queue_path, config.job_lease_timeout)
+    if config.job_queue == "memory":
+        return MemoryJobQueue(config.job_lease_timeout)
+    return None
+
+
+job_queue = create_job_queue()
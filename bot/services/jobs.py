@@ -0,0 +1,76 @@
+import json
+import time
+import uuid
+from dataclasses import dataclass, field, asdict
+
+from bot.services.probe import MediaProbe
+from bot.utils.media_detect import MediaFile
+
+KIND_CIRCLE = "circle"
+KIND_VOICE = "voice"
+KIND_EXTRACT = "extract"
+KIND_BATCH = "batch"
+
+
+@dataclass
+class ConversionJob:
+    kind: str
+    user_id: int
+    chat_id: int
+    media: MediaFile
+    reply_to_message_id: int | None = None
+    status_message_id: int | None = None
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    created_at: float = field(default_factory=time.time)
+    attempts: int = 0
+    start_offset: int = 0
+    media_probe: MediaProbe | None = None
+    
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def from_dict(cls, fields: dict) -> "ConversionJob":
+        media_probe = fields.get("media_probe")
+        return cls(**{
+            **fields,
+            "media": MediaFile(**fields["media"]),
+            "media_probe": MediaProbe.from_dict(media_probe) if media_probe else None
+        })
+
+    @classmethod
+    def from_json(cls, data: str) -> "ConversionJob":
+        return cls.from_dict(json.loads(data))
+
+
+@dataclass
+class ConversionBatch:
+    user_id: int
+    chat_id: int
+    jobs: list[ConversionJob]
+    reply_to_message_id: int | None = None
+    status_message_id: int | None = None
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    created_at: float = field(default_factory=time.time)
+    attempts: int = 0
+
+    @property
+    def kind(self) -> str:
+        return KIND_BATCH
+    
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def from_dict(cls, fields: dict) -> "ConversionBatch":
+        return cls(**{**fields, "jobs": [ConversionJob.from_dict(job) for job in fields["jobs"]]})
+
+
+Job = ConversionJob | ConversionBatch
+
+
+def load_job(data: str) -> Job:
+    fields = json.loads(data)
+    if "jobs" in fields:
+        return ConversionBatch.from_dict(fields)
+    return ConversionJob.from_dict(fields)
@@ -0,0 +1,210 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+STAGE_QUEUE_WAIT = "queue_wait"
+STAGE_GET_FILE = "get_file"
+STAGE_DOWNLOAD = "download"
+STAGE_PROBE = "probe"
+STAGE_ENCODE = "encode"
+STAGE_UPLOAD = "upload"
+STAGE_CLEANUP = "cleanup"
+
+OUTCOME_SUCCESS = "success"
+OUTCOME_ERROR = "error"
+OUTCOME_TIMEOUT = "timeout"
+OUTCOME_CANCELLED = "cancelled"
+
+LabelValues = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Metric:
+    kind = "untyped"
+    
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+    
+    def _key(self, labels: dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+    
+    def samples(self) -> Iterator[str]:
+        return iter(())
+    
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+    
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: dict[LabelValues, float] = {}
+    
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+    
+    def samples(self) -> Iterator[str]:
+        for key, value in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+
+
+class Gauge(Metric):
+    kind = "gauge"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        collect: Callable[[], dict[LabelValues, float]] | None = None
+    ):
+        super().__init__(name, documentation, labels)
+        self.collect = collect
+        self._values: dict[LabelValues, float] = {}
+    
+    def set(self, value: float, **labels: str):
+        self._values[self._key(labels)] = value
+    
+    def samples(self) -> Iterator[str]:
+        values = self._values
+        if self.collect is not None:
+            values = {**values, **self.collect()}
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._counts: dict[LabelValues, list[int]] = {}
+        self._sums: dict[LabelValues, float] = {}
+    
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        counts = self._counts.setdefault(key, [0] * len(self.buckets))
+        counts[bisect_left(self.buckets, value)] += 1
+        self._sums[key] = self._sums.get(key, 0.0) + value
+    
+    def samples(self) -> Iterator[str]:
+        for key, counts in sorted(self._counts.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labels, key, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labels, key)
+            yield f"{self.name}_sum{labels} {_format_value(self._sums[key])}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class MetricsRegistry:
+    
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+    
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+    
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+metrics = MetricsRegistry()
+
+job_stage_seconds = metrics.register(Histogram(
+    "bot_job_stage_seconds",
+    "Time spent in each stage of a conversion job",
+    ("kind", "stage", "outcome")
+))
+job_duration_seconds = metrics.register(Histogram(
+    "bot_job_duration_seconds",
+    "Total time of a conversion job from submission to the final status",
+    ("kind", "outcome")
+))
+jobs_total = metrics.register(Counter(
+    "bot_jobs_total",
+    "Finished conversion jobs",
+    ("kind", "outcome")
+))
+api_retries_total = metrics.register(Counter(
+    "bot_api_retries_total",
+    "Bot API requests retried after flood control, server or network errors",
+    ("method", "reason")
+))
+cache_hits_total = metrics.register(Counter(
+    "bot_cache_hits_total",
+    "Requests answered from the result cache",
+    ("kind",)
+))
+cache_misses_total = metrics.register(Counter(
+    "bot_cache_misses_total",
+    "Result cache lookups that found nothing",
+    ("kind",)
+))
+deduplicated_jobs_total = metrics.register(Counter(
+    "bot_deduplicated_jobs_total",
+    "Requests served by an identical conversion that was already running",
+    ("kind",)
+))
+
+
+class JobTimer:
+    
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.started_at = time.monotonic()
+        self.stages: dict[str, float] = {}
+        self.outcome = OUTCOME_ERROR
+    
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add(name, time.monotonic() - started_at)
+    
+    def record(self):
+        for stage, seconds in self.stages.items():
+            job_stage_seconds.observe(seconds, kind=self.kind, stage=stage, outcome=self.outcome)
+        job_duration_seconds.observe(time.monotonic() - self.started_at, kind=self.kind, outcome=self.outcome)
+        jobs_total.inc(kind=self.kind, outcome=self.outcome)
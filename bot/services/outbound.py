@@ -0,0 +1,242 @@
+import asyncio
+import itertools
+import logging
+import time
+from dataclasses import dataclass
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from bot.config import config
+from bot.services.metrics import Counter, Gauge, Histogram, metrics
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_RESULT = 0
+PRIORITY_MESSAGE = 1
+PRIORITY_PROGRESS = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_RESULT: "result",
+    PRIORITY_MESSAGE: "message",
+    PRIORITY_PROGRESS: "progress",
+}
+
+RESULT_METHODS = {"sendVideoNote", "sendVoice", "sendAudio", "sendVideo", "sendDocument"}
+PROGRESS_METHODS = {"editMessageText"}
+THROTTLED_PREFIXES = ("send", "edit", "copy", "forward")
+
+MAX_IDLE_BUCKETS = 1024
+
+ChatId = int | str
+EditKey = tuple[ChatId, int]
+
+
+def method_priority(name: str) -> int:
+    if name in RESULT_METHODS:
+        return PRIORITY_RESULT
+    if name in PROGRESS_METHODS:
+        return PRIORITY_PROGRESS
+    return PRIORITY_MESSAGE
+
+
+def is_group(chat_id: ChatId) -> bool:
+    return isinstance(chat_id, str) or chat_id < 0
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated_at", "blocked_until")
+    
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+    
+    def _refill(self, now: float):
+        if self.rate > 0:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+    
+    def ready_at(self, now: float) -> float:
+        self._refill(now)
+        if self.rate <= 0 or self.tokens >= 1:
+            return max(now, self.blocked_until)
+        return max(now + (1 - self.tokens) / self.rate, self.blocked_until)
+    
+    def take(self, now: float):
+        self._refill(now)
+        if self.rate > 0:
+            self.tokens -= 1
+    
+    def block(self, until: float):
+        self.blocked_until = max(self.blocked_until, until)
+        self.tokens = min(self.tokens, 0.0)
+    
+    def idle(self, now: float) -> bool:
+        return self.ready_at(now) <= now and self.tokens >= self.burst
+
+
+@dataclass(eq=False)
+class Waiter:
+    priority: int
+    seq: int
+    chat_id: ChatId
+    edit_key: EditKey | None
+    future: asyncio.Future
+
+    @property
+    def order(self) -> tuple[int, int]:
+        return self.priority, self.seq
+
+
+class OutboundGateway(BaseRequestMiddleware):
+    
+    def __init__(self, global_rate: float, chat_rate: float, chat_burst: int, group_rate: float):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.chat_buckets: dict[ChatId, TokenBucket] = {}
+        self._waiters: list[Waiter] = []
+        self._edits: dict[EditKey, Waiter] = {}
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+    
+    def __len__(self) -> int:
+        return len(self._waiters)
+    
+    def bucket(self, chat_id: ChatId) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self.chat_buckets) >= MAX_IDLE_BUCKETS:
+                self._prune(time.monotonic())
+            rate = self.group_rate / 60 if is_group(chat_id) else self.chat_rate
+            bucket = self.chat_buckets[chat_id] = TokenBucket(rate, self.chat_burst)
+        return bucket
+    
+    def _prune(self, now: float):
+        waiting = {waiter.chat_id for waiter in self._waiters}
+        for chat_id, bucket in list(self.chat_buckets.items()):
+            if chat_id not in waiting and bucket.idle(now):
+                del self.chat_buckets[chat_id]
+    
+    def _discard(self, waiter: Waiter):
+        if waiter in self._waiters:
+            self._waiters.remove(waiter)
+        if waiter.edit_key is not None and self._edits.get(waiter.edit_key) is waiter:
+            del self._edits[waiter.edit_key]
+    
+    def _grant(self, waiter: Waiter, now: float):
+        self._discard(waiter)
+        self.global_bucket.take(now)
+        self.bucket(waiter.chat_id).take(now)
+        if not waiter.future.done():
+            waiter.future.set_result(True)
+    
+    def _dispatch(self, now: float) -> float | None:
+        wake_at = None
+        for waiter in sorted(self._waiters, key=lambda item: item.order):
+            if waiter.future.done():
+                self._discard(waiter)
+                continue
+            
+            ready_at = max(self.global_bucket.ready_at(now), self.bucket(waiter.chat_id).ready_at(now))
+            if ready_at <= now:
+                self._grant(waiter, now)
+            elif wake_at is None or ready_at < wake_at:
+                wake_at = ready_at
+        return wake_at
+    
+    async def _run(self):
+        while self._waiters:
+            self._wakeup.clear()
+            now = time.monotonic()
+            wake_at = self._dispatch(now)
+            if not self._waiters:
+                break
+            
+            try:
+                async with asyncio.timeout(None if wake_at is None else wake_at - now):
+                    await self._wakeup.wait()
+            except TimeoutError:
+                pass
+    
+    async def acquire(self, chat_id: ChatId, priority: int, edit_key: EditKey | None = None) -> bool:
+        waiter = Waiter(priority, next(self._seq), chat_id, edit_key, asyncio.get_running_loop().create_future())
+        if edit_key is not None:
+            previous = self._edits.get(edit_key)
+            if previous is not None:
+                self._discard(previous)
+                waiter.priority = min(waiter.priority, previous.priority)
+                waiter.seq = previous.seq
+                if not previous.future.done():
+                    previous.future.set_result(False)
+                outbound_superseded_total.inc()
+            self._edits[edit_key] = waiter
+        
+        self._waiters.append(waiter)
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        
+        try:
+            return await waiter.future
+        finally:
+            self._discard(waiter)
+    
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType]
+    ) -> Response[TelegramType]:
+        name = method.__api_method__
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None or not name.startswith(THROTTLED_PREFIXES):
+            return await make_request(bot, method)
+        
+        priority = method_priority(name)
+        edit_key = None
+        if name in PROGRESS_METHODS and getattr(method, "message_id", None) is not None:
+            edit_key = (chat_id, method.message_id)
+        
+        started_at = time.monotonic()
+        if not await self.acquire(chat_id, priority, edit_key):
+            return True
+        outbound_wait_seconds.observe(time.monotonic() - started_at, priority=PRIORITY_NAMES[priority])
+        
+        try:
+            return await make_request(bot, method)
+        except TelegramRetryAfter as e:
+            logger.info("Flood control in chat %s: %s paused for %ss", chat_id, name, e.retry_after)
+            self.bucket(chat_id).block(time.monotonic() + e.retry_after)
+            raise
+
+
+gateway = OutboundGateway(
+    config.outbound_global_rate,
+    config.outbound_chat_rate,
+    config.outbound_chat_burst,
+    config.outbound_group_rate
+)
+
+outbound_wait_seconds = metrics.register(Histogram(
+    "bot_outbound_wait_seconds",
+    "Time outgoing messages waited for the Telegram rate limits",
+    ("priority",)
+))
+outbound_superseded_total = metrics.register(Counter(
+    "bot_outbound_superseded_total",
+    "Status edits dropped because a newer text for the same message was queued"
+))
+outbound_queue = metrics.register(Gauge(
+    "bot_outbound_queue",
+    "Outgoing messages waiting for the Telegram rate limits",
+    collect=lambda: {(): len(gateway)}
+))
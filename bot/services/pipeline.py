@@ -0,0 +1,770 @@
+import asyncio
+import logging
+import time
+from functools import partial
+from typing import AsyncIterator, Awaitable, Callable
+
+import aiofiles
+from aiogram import Bot
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+from aiogram.types import FSInputFile, Message, ReplyParameters
+
+from bot.config import config
+from bot.services.cache import ResultCache, CachedResult, result_cache
+from bot.services.converter import (
+    ConversionService,
+    ConversionResult,
+    Progress,
+    ProgressCallback,
+    SEGMENT_MIN_LENGTH,
+    VIDEO_NOTE_ENCODER_ARGS,
+    VOICE_COMPRESSION_LEVEL,
+    VOICE_ENCODER_ARGS,
+)
+from bot.services.jobs import ConversionBatch, ConversionJob, Job, KIND_CIRCLE, KIND_EXTRACT, KIND_VOICE
+from bot.services.metrics import (
+    JobTimer,
+    OUTCOME_CANCELLED,
+    OUTCOME_SUCCESS,
+    OUTCOME_TIMEOUT,
+    STAGE_CLEANUP,
+    STAGE_DOWNLOAD,
+    STAGE_ENCODE,
+    STAGE_GET_FILE,
+    STAGE_PROBE,
+    STAGE_QUEUE_WAIT,
+    STAGE_UPLOAD,
+    deduplicated_jobs_total,
+)
+from bot.services.probe import MediaProbe
+from bot.services.profiles import EncoderProfile
+from bot.services.registry import registry
+from bot.services.supervisor import ProcessLimits, ProcessSupervisor
+from bot.services.singleflight import SingleFlight
+from bot.services.scheduler import (
+    Ticket,
+    scheduler,
+    estimate_cost,
+    LANE_AUDIO,
+    LANE_VIDEO,
+    AUDIO_BYTES_PER_SECOND,
+    VIDEO_BYTES_PER_SECOND,
+)
+from bot.utils.temp_file import Reservation, StorageFull, TempFileManager, temp_storage
+from bot.utils.media_detect import (
+    MediaFile,
+    can_stream_input,
+    get_extension,
+    header_duration,
+    may_contain_opus,
+    sniff_container,
+)
+from bot.utils.status import BatchStatus, StatusMessage, format_position, progress_text
+from bot.utils.stream_file import (
+    RangeNotSupported,
+    StreamInputFile,
+    download_ranges,
+    local_file_path,
+    prepend,
+    stream_download,
+)
+
+logger = logging.getLogger(__name__)
+
+VIDEO_NOTE_BYTES_PER_SECOND = 256 * 1024
+VOICE_BYTES_PER_SECOND = 16 * 1024
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+supervisor = ProcessSupervisor(ProcessLimits(
+    cpu_seconds=config.ffmpeg_cpu_limit,
+    memory_bytes=config.ffmpeg_memory_limit_mb * 1024 * 1024,
+    nice=config.ffmpeg_nice
+))
+converter = ConversionService(supervisor)
+inflight: SingleFlight[CachedResult] = SingleFlight()
+FOLLOW_ATTEMPTS = 2
+
+STATUS_TEXTS = {
+    KIND_CIRCLE: ("Обрабатываю видео...", "Конвертирую в кружок...", "Отправляю кружок..."),
+    KIND_EXTRACT: ("Обрабатываю видео...", "Извлекаю аудио...", "Отправляю голосовое сообщение..."),
+    KIND_VOICE: ("Обрабатываю аудио...", "Конвертирую в голосовое...", "Отправляю голосовое сообщение..."),
+}
+
+RESTART_TEXT = "Бот перезапускается. Файл будет обработан сразу после перезапуска."
+
+INPUT_EXTENSIONS = {
+    KIND_CIRCLE: ".mp4",
+    KIND_EXTRACT: ".mp4",
+    KIND_VOICE: ".mp3",
+}
+
+
+def cache_key(file_unique_id: str, kind: str, start: int = 0) -> str:
+    if kind == KIND_CIRCLE:
+        params = {
+            "size": config.video_note_size,
+            "max_duration": config.max_video_duration,
+            "encoder": VIDEO_NOTE_ENCODER_ARGS,
+            "profile": config.encoder_profile,
+        }
+        if start:
+            params["start"] = start
+    else:
+        params = {"encoder": VOICE_ENCODER_ARGS}
+    return ResultCache.make_key(file_unique_id, kind, params)
+
+
+def job_cache_key(job: ConversionJob) -> str:
+    return cache_key(job.media.file_unique_id, job.kind, job.start_offset)
+
+
+def trimmed_text(original_duration: int, start: int = 0) -> str:
+    if start:
+        end = start + config.max_video_duration
+        if original_duration:
+            end = min(end, original_duration)
+        return f"\n\nВзят фрагмент {format_position(start)}–{format_position(end)}."
+    return f"\n\nВидео было обрезано с {original_duration} до {config.max_video_duration} секунд."
+
+
+def reply_parameters(job: Job) -> ReplyParameters | None:
+    if job.reply_to_message_id is None:
+        return None
+    return ReplyParameters(message_id=job.reply_to_message_id, allow_sending_without_reply=True)
+
+
+async def reply(bot: Bot, job: Job, text: str) -> Message:
+    return await bot.send_message(job.chat_id, text, reply_parameters=reply_parameters(job))
+
+
+async def send_result(bot: Bot, job: ConversionJob, file, duration: int) -> str:
+    if job.kind == KIND_CIRCLE:
+        sent = await bot.send_video_note(
+            job.chat_id,
+            video_note=file,
+            duration=min(duration, config.max_video_duration),
+            length=config.video_note_size,
+            reply_parameters=reply_parameters(job),
+            request_timeout=config.api_upload_timeout
+        )
+        return sent.video_note.file_id
+    
+    sent = await bot.send_voice(
+        job.chat_id,
+        voice=file,
+        duration=duration,
+        reply_parameters=reply_parameters(job),
+        request_timeout=config.api_upload_timeout
+    )
+    return sent.voice.file_id
+
+
+def done_text(job: ConversionJob, cached: CachedResult) -> str:
+    if job.kind == KIND_CIRCLE and cached.was_trimmed:
+        return f"Готово!{trimmed_text(cached.original_duration, job.start_offset)}"
+    return "Готово!"
+
+
+async def resend(bot: Bot, job: ConversionJob, cached: CachedResult) -> bool:
+    try:
+        await send_result(bot, job, cached.file_id, cached.duration)
+    except Exception:
+        return False
+    return True
+
+
+async def send_cached(bot: Bot, job: ConversionJob, cached: CachedResult) -> bool:
+    if not await resend(bot, job, cached):
+        return False
+    
+    if job.kind == KIND_CIRCLE and cached.was_trimmed:
+        await reply(bot, job, done_text(job, cached))
+    return True
+
+
+async def write_chunks(path: str, chunks: AsyncIterator[bytes]):
+    async with aiofiles.open(path, "wb") as f:
+        async for chunk in chunks:
+            await f.write(chunk)
+
+
+def ranged_download(size: int) -> bool:
+    return config.download_connections > 1 and size >= 2 * config.download_part_mb * 1024 * 1024
+
+
+async def download_input(bot: Bot, file_path: str, path: str, size: int, head: bytes, chunks: AsyncIterator[bytes]):
+    if not ranged_download(size):
+        await write_chunks(path, prepend(head, chunks))
+        return
+    
+    await chunks.aclose()
+    try:
+        await download_ranges(
+            bot,
+            file_path,
+            path,
+            size,
+            prefix=head,
+            connections=config.download_connections,
+            part_size=config.download_part_mb * 1024 * 1024,
+            retries=config.api_retries
+        )
+    except RangeNotSupported as e:
+        logger.info("Falling back to a single download stream: %s", e)
+        await write_chunks(path, stream_download(bot, file_path, retries=config.api_retries))
+
+
+async def stream_voice(
+    bot: Bot,
+    job: ConversionJob,
+    source: AsyncIterator[bytes],
+    on_progress: ProgressCallback,
+    duration: int,
+    media_probe: MediaProbe | None = None,
+    compression_level: int = VOICE_COMPRESSION_LEVEL
+) -> tuple[ConversionResult, str | None]:
+    stream = await converter.open_voice_stream(
+        source,
+        video_input=job.kind == KIND_EXTRACT,
+        on_progress=on_progress,
+        media_probe=media_probe,
+        compression_level=compression_level
+    )
+    try:
+        sent_file_id = await send_result(bot, job, StreamInputFile(stream.read(), "voice.ogg"), duration)
+    except asyncio.CancelledError:
+        await stream.abort()
+        raise
+    except Exception:
+        if stream.process.returncode is None:
+            await stream.abort()
+            raise
+        result = await stream.finish()
+        if result.success:
+            raise
+        return result, None
+    
+    return await stream.finish(), sent_file_id
+
+
+async def probe_stream_head(head: bytes) -> MediaProbe | None:
+    try:
+        return await converter.probe_head(head)
+    except Exception as e:
+        logger.info("Header probe failed: %s", e)
+        return None
+
+
+async def convert(
+    kind: str,
+    input_path: str,
+    output_path: str,
+    profile: EncoderProfile,
+    threads: int,
+    on_progress: ProgressCallback,
+    start: int = 0,
+    segments: int = 1,
+    known_duration: int = 0,
+    media_probe: MediaProbe | None = None
+):
+    if kind == KIND_CIRCLE:
+        return await converter.convert_to_video_note(
+            input_path,
+            output_path,
+            config.video_note_size,
+            config.max_video_duration,
+            media_probe=media_probe,
+            profile=profile,
+            threads=threads,
+            on_progress=on_progress,
+            start=start,
+            segments=segments,
+            known_duration=known_duration
+        )
+    if kind == KIND_EXTRACT:
+        return await converter.extract_audio_from_video(
+            input_path,
+            output_path,
+            media_probe=media_probe,
+            on_progress=on_progress,
+            compression_level=profile.opus_compression
+        )
+    return await converter.convert_to_voice(
+        input_path,
+        output_path,
+        media_probe=media_probe,
+        on_progress=on_progress,
+        compression_level=profile.opus_compression
+    )
+
+
+def progress_reporter(status: StatusMessage, kind: str, media: MediaFile, start: int = 0) -> ProgressCallback:
+    title = STATUS_TEXTS[kind][1]
+    
+    async def report(progress: Progress):
+        if progress.done:
+            return
+        total = progress.input_duration or media.duration
+        if kind == KIND_CIRCLE:
+            total = min(total - start, config.max_video_duration)
+        status.update(progress_text(title, progress.out_time, total, progress.speed))
+    
+    return report
+
+
+def estimated_duration(kind: str, media: MediaFile) -> float:
+    if media.duration:
+        return media.duration
+    bytes_per_second = AUDIO_BYTES_PER_SECOND if kind == KIND_VOICE else VIDEO_BYTES_PER_SECOND
+    return media.file_size / bytes_per_second
+
+
+def job_lane(kind: str) -> str:
+    return LANE_VIDEO if kind == KIND_CIRCLE else LANE_AUDIO
+
+
+def job_cost(kind: str, media: MediaFile) -> float:
+    lane = job_lane(kind)
+    if lane == LANE_VIDEO:
+        return estimate_cost(
+            lane,
+            media.duration,
+            media.width,
+            media.height,
+            media.file_size,
+            config.max_video_duration
+        )
+    return estimate_cost(lane, estimated_duration(kind, media))
+
+
+def parallel_segments(job: ConversionJob) -> int:
+    if job.kind != KIND_CIRCLE or config.segment_workers < 2:
+        return 1
+    
+    duration = min(job.media.duration - job.start_offset, config.max_video_duration)
+    if duration < max(config.segment_min_duration, SEGMENT_MIN_LENGTH * 2):
+        return 1
+    return min(config.segment_workers, int(duration // SEGMENT_MIN_LENGTH))
+
+
+def storage_estimate(kind: str, media: MediaFile, streaming: bool, local: bool = False, segments: int = 1) -> int:
+    size = 0 if streaming or local else media.file_size
+    if kind == KIND_CIRCLE:
+        duration = min(media.duration or config.max_video_duration, config.max_video_duration)
+        size += duration * VIDEO_NOTE_BYTES_PER_SECOND * (2 if segments > 1 else 1)
+    elif not streaming:
+        size += estimated_duration(kind, media) * VOICE_BYTES_PER_SECOND
+    return int(size)
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600} ч {seconds % 3600 // 60} мин"
+    if seconds >= 60:
+        return f"{seconds // 60} мин"
+    return f"{seconds} с"
+
+
+def error_text(error: Exception) -> str:
+    if isinstance(error, TelegramRetryAfter):
+        return f"Telegram временно ограничил отправку сообщений. Попробуйте через {format_duration(error.retry_after)}."
+    if isinstance(error, (TelegramNetworkError, TelegramServerError)):
+        return "Не удалось связаться с Telegram. Попробуйте отправить файл ещё раз."
+    return f"Произошла ошибка: {str(error)}"
+
+
+def admission_error(kind: str, media: MediaFile, start: int = 0) -> str | None:
+    if media.file_size > config.max_file_size:
+        return (
+            f"Файл слишком большой.\n"
+            f"Максимальный размер: {config.max_file_size // (1024 * 1024)} МБ\n"
+            f"Ваш файл: {media.file_size // (1024 * 1024)} МБ"
+        )
+    if kind == KIND_CIRCLE:
+        if media.duration and start >= media.duration:
+            return (
+                f"Видео короче начала фрагмента.\n"
+                f"Начало: {format_position(start)}, длительность видео: {format_position(media.duration)}"
+            )
+        return None
+    
+    duration = estimated_duration(kind, media)
+    if config.max_audio_duration and duration > config.max_audio_duration:
+        return (
+            f"Файл слишком длинный.\n"
+            f"Максимальная длительность: {format_duration(config.max_audio_duration)}\n"
+            f"Ваш файл: {format_duration(duration)}"
+        )
+    if duration * VOICE_BYTES_PER_SECOND > config.max_upload_size:
+        return (
+            f"Голосовое сообщение получится больше {config.max_upload_size // (1024 * 1024)} МБ, "
+            f"Telegram не примет его. Попробуйте файл покороче."
+        )
+    return None
+
+
+def queue_text(position: int) -> str:
+    return f"Вы #{position} в очереди. Начну обработку, как только освободится место."
+
+
+async def run_conversion(
+    bot: Bot,
+    job: ConversionJob,
+    status: StatusMessage,
+    ticket: Ticket,
+    timer: JobTimer,
+    wait_turn: Callable[[], Awaitable[None]] | None = None
+) -> CachedResult | None:
+    kind, media = job.kind, job.media
+    _, converting_text, sending_text = STATUS_TEXTS[kind]
+    
+    reservation: Reservation | None = None
+    chunks = None
+    
+    try:
+        ext = get_extension(media.filename, INPUT_EXTENSIONS[kind])
+        output_extension = ".mp4" if kind == KIND_CIRCLE else ".ogg"
+        
+        with timer.stage(STAGE_GET_FILE):
+            file = await bot.get_file(media.file_id)
+        local_path = local_file_path(bot, file.file_path)
+        local = local_path is not None
+        segments = parallel_segments(job)
+        
+        with timer.stage(STAGE_QUEUE_WAIT):
+            reservation = await temp_storage.reserve(
+                storage_estimate(kind, media, False, local=local, segments=segments),
+                config.temp_wait_timeout
+            )
+        if segments > 1:
+            segments = scheduler.borrow(ticket, segments - 1) + 1
+        
+        streaming = False
+        if local_path is None:
+            with timer.stage(STAGE_DOWNLOAD):
+                chunks = stream_download(bot, file.file_path, retries=config.api_retries)
+                head = await anext(chunks, b"")
+            source = prepend(head, chunks)
+            streaming = config.streaming_enabled and can_stream_input(ext, head)
+            if wait_turn is not None and kind != KIND_CIRCLE:
+                streaming = False
+        
+        if segments > 1:
+            streaming = False
+        
+        media_probe = job.media_probe
+        duration = media.duration
+        if streaming and kind != KIND_CIRCLE and (not duration or may_contain_opus(ext)):
+            if media_probe is None:
+                with timer.stage(STAGE_PROBE):
+                    media_probe = await probe_stream_head(head)
+                if not duration and media_probe is not None:
+                    duration = header_duration(sniff_container(head), media_probe.duration)
+            if not duration:
+                streaming = False
+        
+        temp_storage.shrink(reservation, storage_estimate(kind, media, streaming, local=local, segments=segments))
+        temp_manager = TempFileManager(reservation.path)
+        output_path = temp_manager.create_temp_path("output", output_extension)
+        
+        if local_path is not None:
+            input_path = local_path
+        elif not streaming:
+            with timer.stage(STAGE_DOWNLOAD):
+                input_path = temp_manager.create_temp_path("input", ext)
+                await download_input(bot, file.file_path, input_path, file.file_size or media.file_size, head, chunks)
+        
+        status.update(converting_text)
+        
+        profile = scheduler.select_profile(ticket.lane)
+        threads = scheduler.threads_per_job()
+        on_progress = progress_reporter(status, kind, media, job.start_offset)
+        
+        if streaming and kind != KIND_CIRCLE:
+            with timer.stage(STAGE_UPLOAD):
+                result, sent_file_id = await stream_voice(
+                    bot,
+                    job,
+                    source,
+                    on_progress,
+                    duration,
+                    media_probe,
+                    profile.opus_compression
+                )
+        else:
+            if streaming:
+                result = await converter.convert_to_video_note_stream(
+                    source,
+                    output_path,
+                    config.video_note_size,
+                    config.max_video_duration,
+                    media.duration,
+                    profile=profile,
+                    threads=threads,
+                    on_progress=on_progress,
+                    start=job.start_offset
+                )
+            else:
+                result = await convert(
+                    kind,
+                    input_path,
+                    output_path,
+                    profile,
+                    threads,
+                    on_progress,
+                    job.start_offset,
+                    segments,
+                    media.duration,
+                    media_probe
+                )
+                scheduler.give_back(ticket)
+            
+            sent_file_id = None
+            if result.success:
+                warning_text = ""
+                if result.was_trimmed:
+                    warning_text = f"\n\nВидео было обрезано до {config.max_video_duration} секунд."
+                
+                if wait_turn is not None:
+                    await wait_turn()
+                status.update(f"{sending_text}{warning_text}")
+                
+                with timer.stage(STAGE_UPLOAD):
+                    sent_file_id = await send_result(bot, job, FSInputFile(output_path, chunk_size=UPLOAD_CHUNK_SIZE), result.duration)
+        
+        if result.probe_time:
+            timer.add(STAGE_PROBE, result.probe_time)
+        timer.add(STAGE_ENCODE, result.encode_time)
+        
+        logger.info(
+            "Job finished: kind=%s success=%s profile=%s threads=%d segments=%d encode_time=%.2f cost=%.1f queue=%d",
+            kind,
+            result.success,
+            result.profile or "-",
+            threads,
+            result.segments,
+            result.encode_time,
+            ticket.cost,
+            scheduler.queue_depth(ticket.lane)
+        )
+        
+        if not result.success:
+            await status.set(f"Ошибка конвертации: {result.error}")
+            return
+        
+        cached = CachedResult(
+            file_id=sent_file_id,
+            duration=result.duration,
+            original_duration=result.original_duration,
+            was_trimmed=result.was_trimmed
+        )
+        await result_cache.set(job_cache_key(job), cached)
+        
+        await status.set(done_text(job, cached))
+        timer.outcome = OUTCOME_SUCCESS
+        return cached
+    
+    except StorageFull as e:
+        logger.warning("Job rejected: kind=%s size=%d %s", kind, media.file_size, e)
+        if chunks is not None:
+            await chunks.aclose()
+        await status.set(str(e))
+    
+    except Exception as e:
+        await status.set(error_text(e))
+    
+    finally:
+        with timer.stage(STAGE_CLEANUP):
+            if reservation is not None:
+                temp_storage.release(reservation)
+
+
+async def open_status(bot: Bot, job: Job, text: str) -> StatusMessage:
+    if job.status_message_id is None:
+        message = await reply(bot, job, text)
+        job.status_message_id = message.message_id
+        return StatusMessage.from_message(bot, message)
+    
+    status = StatusMessage(bot, job.chat_id, job.status_message_id)
+    await status.set(text)
+    return status
+
+
+async def follow_inflight(
+    bot: Bot,
+    job: ConversionJob,
+    key: str,
+    wait_turn: Callable[[], Awaitable[None]] | None = None
+) -> CachedResult | None:
+    cached = await inflight.wait(key)
+    if cached is None:
+        return None
+    if wait_turn is not None:
+        await wait_turn()
+    if not await resend(bot, job, cached):
+        return None
+    
+    deduplicated_jobs_total.inc(kind=job.kind)
+    return cached
+
+
+async def execute_job(bot: Bot, job: ConversionJob):
+    kind = job.kind
+    processing_text = STATUS_TEXTS[kind][0]
+    key = job_cache_key(job)
+    ticket = None
+    timer = JobTimer(kind)
+    status = None
+    
+    with registry.register(job.user_id, kind, job.job_id, job) as active:
+        try:
+            for _ in range(FOLLOW_ATTEMPTS):
+                if not inflight.leading(key):
+                    break
+                if status is None:
+                    status = await open_status(bot, job, processing_text)
+                cached = await follow_inflight(bot, job, key)
+                if cached is not None:
+                    await status.set(done_text(job, cached))
+                    return
+            
+            with inflight.lead(key) as flight:
+                ticket = scheduler.submit(job.user_id, job_lane(kind), job_cost(kind, job.media))
+                if ticket.started.done():
+                    timer.add(STAGE_QUEUE_WAIT, max(time.time() - job.created_at, 0.0))
+                    status = await open_status(bot, job, processing_text)
+                else:
+                    status = await open_status(bot, job, queue_text(scheduler.position(ticket)))
+                    await scheduler.wait(ticket)
+                    timer.add(STAGE_QUEUE_WAIT, max(time.time() - job.created_at, 0.0))
+                    status.update(processing_text)
+                active.running = True
+                
+                async with asyncio.timeout(config.job_timeout or None):
+                    flight.set_result(await run_conversion(bot, job, status, ticket, timer))
+        
+        except TimeoutError:
+            timer.outcome = OUTCOME_TIMEOUT
+            logger.warning("Job timed out: kind=%s user=%s timeout=%ds", kind, job.user_id, config.job_timeout)
+            await status.set(f"Превышено время обработки ({config.job_timeout} с). Попробуйте файл покороче.")
+        
+        except asyncio.CancelledError:
+            timer.outcome = OUTCOME_CANCELLED
+            if active.interrupted and status is not None:
+                await status.set(RESTART_TEXT)
+            if not active.cancelled:
+                raise
+            if status is not None:
+                await status.set("Обработка отменена.")
+        
+        finally:
+            if ticket is not None:
+                scheduler.release(ticket)
+                timer.record()
+
+
+class BatchOrder:
+    
+    def __init__(self, size: int):
+        self._started = [asyncio.Event() for _ in range(size)]
+        self._finished = [asyncio.Event() for _ in range(size)]
+    
+    async def wait_start(self, index: int):
+        if index:
+            await self._started[index - 1].wait()
+    
+    async def wait_turn(self, index: int):
+        if index:
+            await self._finished[index - 1].wait()
+    
+    def start(self, index: int):
+        self._started[index].set()
+    
+    def finish(self, index: int):
+        self._started[index].set()
+        self._finished[index].set()
+
+
+async def execute_batch_item(bot: Bot, batch: ConversionBatch, index: int, progress: BatchStatus, order: BatchOrder):
+    job = batch.jobs[index]
+    kind = job.kind
+    status = progress.item(index)
+    ticket = None
+    timer = JobTimer(kind)
+    
+    with registry.register(job.user_id, kind, batch.job_id, job) as active:
+        try:
+            await order.wait_start(index)
+            
+            key = job_cache_key(job)
+            cached = await result_cache.get(key)
+            if cached is not None:
+                await order.wait_turn(index)
+                if await resend(bot, job, cached):
+                    await status.set(done_text(job, cached))
+                    return
+                await result_cache.delete(key)
+            
+            for _ in range(FOLLOW_ATTEMPTS):
+                if not inflight.leading(key):
+                    break
+                await status.set(STATUS_TEXTS[kind][0])
+                cached = await follow_inflight(bot, job, key, partial(order.wait_turn, index))
+                if cached is not None:
+                    await status.set(done_text(job, cached))
+                    return
+            
+            with inflight.lead(key) as flight:
+                ticket = scheduler.submit(job.user_id, job_lane(kind), job_cost(kind, job.media))
+                if not ticket.started.done():
+                    await status.set("В очереди...")
+                    await scheduler.wait(ticket)
+                active.running = True
+                order.start(index)
+                timer.add(STAGE_QUEUE_WAIT, max(time.time() - batch.created_at, 0.0))
+                await status.set(STATUS_TEXTS[kind][0])
+                
+                async with asyncio.timeout(config.job_timeout or None):
+                    cached = await run_conversion(bot, job, status, ticket, timer, partial(order.wait_turn, index))
+                    flight.set_result(cached)
+        
+        except TimeoutError:
+            timer.outcome = OUTCOME_TIMEOUT
+            logger.warning("Job timed out: kind=%s user=%s timeout=%ds", kind, job.user_id, config.job_timeout)
+            await status.set(f"Превышено время обработки ({config.job_timeout} с).")
+        
+        except asyncio.CancelledError:
+            timer.outcome = OUTCOME_CANCELLED
+            if active.interrupted:
+                await status.set(RESTART_TEXT)
+            if not active.cancelled:
+                raise
+            await status.set("Обработка отменена.")
+        
+        finally:
+            order.finish(index)
+            progress.mark_done()
+            if ticket is not None:
+                scheduler.release(ticket)
+                timer.record()
+
+
+async def execute_batch(bot: Bot, batch: ConversionBatch):
+    status = await open_status(bot, batch, f"Получено файлов: {len(batch.jobs)}. Начинаю обработку...")
+    progress = BatchStatus(status, [job.media.filename or "" for job in batch.jobs])
+    order = BatchOrder(len(batch.jobs))
+    
+    logger.info("Batch started: user=%s files=%d", batch.user_id, len(batch.jobs))
+    await asyncio.gather(*(
+        execute_batch_item(bot, batch, index, progress, order)
+        for index in range(len(batch.jobs))
+    ))
+    await progress.finish("Обработка завершена.")
+
+
+async def execute(bot: Bot, job: Job):
+    if isinstance(job, ConversionBatch):
+        await execute_batch(bot, job)
+    else:
+        await execute_job(bot, job)
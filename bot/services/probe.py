@@ -0,0 +1,173 @@
+import asyncio
+import json
+from dataclasses import dataclass, field
+
+from bot.services.supervisor import ProcessSupervisor
+
+
+def _int(value) -> int:
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+@dataclass
+class StreamInfo:
+    index: int
+    codec_type: str
+    codec_name: str
+    width: int = 0
+    height: int = 0
+    pix_fmt: str = ""
+    channels: int = 0
+    sample_rate: int = 0
+    bit_rate: int = 0
+    duration: float = 0.0
+    rotation: int = 0
+
+    @classmethod
+    def from_ffprobe(cls, data: dict) -> "StreamInfo":
+        rotation = _int(data.get("tags", {}).get("rotate"))
+        for side_data in data.get("side_data_list", []):
+            if "rotation" in side_data:
+                rotation = _int(side_data["rotation"])
+        
+        return cls(
+            index=_int(data.get("index")),
+            codec_type=data.get("codec_type", ""),
+            codec_name=data.get("codec_name", ""),
+            width=_int(data.get("width")),
+            height=_int(data.get("height")),
+            pix_fmt=data.get("pix_fmt", ""),
+            channels=_int(data.get("channels")),
+            sample_rate=_int(data.get("sample_rate")),
+            bit_rate=_int(data.get("bit_rate")),
+            duration=_float(data.get("duration")),
+            rotation=rotation % 360,
+        )
+
+
+@dataclass
+class MediaProbe:
+    duration: float = 0.0
+    format_name: str = ""
+    bit_rate: int = 0
+    size: int = 0
+    streams: list[StreamInfo] = field(default_factory=list)
+
+    @classmethod
+    def from_ffprobe(cls, data: dict) -> "MediaProbe":
+        fmt = data.get("format", {})
+        streams = [StreamInfo.from_ffprobe(item) for item in data.get("streams", [])]
+        
+        duration = _float(fmt.get("duration"))
+        if not duration:
+            duration = max((item.duration for item in streams), default=0.0)
+        
+        return cls(
+            duration=duration,
+            format_name=fmt.get("format_name", ""),
+            bit_rate=_int(fmt.get("bit_rate")),
+            size=_int(fmt.get("size")),
+            streams=streams,
+        )
+
+    @classmethod
+    def from_dict(cls, fields: dict) -> "MediaProbe":
+        return cls(**{**fields, "streams": [StreamInfo(**item) for item in fields["streams"]]})
+
+    @property
+    def video(self) -> StreamInfo | None:
+        return next((item for item in self.streams if item.codec_type == "video"), None)
+
+    @property
+    def audio(self) -> StreamInfo | None:
+        return next((item for item in self.streams if item.codec_type == "audio"), None)
+
+    @property
+    def has_video(self) -> bool:
+        return self.video is not None
+
+    @property
+    def has_audio(self) -> bool:
+        return self.audio is not None
+
+    @property
+    def rotation(self) -> int:
+        return self.video.rotation if self.video else 0
+
+    @property
+    def resolution(self) -> tuple[int, int]:
+        if self.video is None:
+            return 0, 0
+        if self.rotation in (90, 270):
+            return self.video.height, self.video.width
+        return self.video.width, self.video.height
+
+    @property
+    def video_codec(self) -> str:
+        return self.video.codec_name if self.video else ""
+
+    @property
+    def audio_codec(self) -> str:
+        return self.audio.codec_name if self.audio else ""
+
+
+default_supervisor = ProcessSupervisor()
+
+
+async def _run_ffprobe(
+    source: str,
+    data: bytes | None = None,
+    supervisor: ProcessSupervisor | None = None
+) -> MediaProbe | None:
+    cmd = [
+        "ffprobe",
+        "-v", "quiet",
+        "-print_format", "json",
+        "-show_format",
+        "-show_streams",
+        source
+    ]
+    
+    supervisor = supervisor or default_supervisor
+    process = await supervisor.spawn(
+        *cmd,
+        stdin=asyncio.subprocess.PIPE if data is not None else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL
+    )
+    
+    try:
+        stdout, _ = await process.communicate(data)
+    except (BrokenPipeError, ConnectionResetError):
+        stdout = await process.stdout.read()
+        await process.wait()
+    except BaseException:
+        supervisor.kill(process)
+        raise
+    
+    if process.returncode != 0 or not stdout:
+        return None
+    
+    try:
+        return MediaProbe.from_ffprobe(json.loads(stdout.decode()))
+    except (json.JSONDecodeError, ValueError):
+        return None
+
+
+async def probe_file(path: str, supervisor: ProcessSupervisor | None = None) -> MediaProbe | None:
+    return await _run_ffprobe(path, supervisor=supervisor)
+
+
+async def probe_bytes(head: bytes, supervisor: ProcessSupervisor | None = None) -> MediaProbe | None:
+    return await _run_ffprobe("pipe:0", head, supervisor)
+
@@ -0,0 +1,40 @@
+import os
+from dataclasses import dataclass
+
+PROFILE_QUALITY = "quality"
+PROFILE_BALANCED = "balanced"
+PROFILE_FAST = "fast"
+
+
+@dataclass(frozen=True)
+class EncoderProfile:
+    name: str
+    preset: str
+    crf: int
+    audio_bitrate: str
+    opus_compression: int = 10
+
+
+DEFAULT_PROFILES = {
+    PROFILE_QUALITY: EncoderProfile(PROFILE_QUALITY, "medium", 23, "128k"),
+    PROFILE_BALANCED: EncoderProfile(PROFILE_BALANCED, "veryfast", 23, "128k", 6),
+    PROFILE_FAST: EncoderProfile(PROFILE_FAST, "superfast", 25, "96k", 2),
+}
+
+
+def load_profiles(spec: str, selected: str = "auto") -> dict[str, EncoderProfile]:
+    profiles = dict(DEFAULT_PROFILES)
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, preset, crf, audio_bitrate, *rest = item.split(":")
+        default = DEFAULT_PROFILES.get(name, DEFAULT_PROFILES[PROFILE_QUALITY])
+        opus_compression = int(rest[0]) if rest else default.opus_compression
+        profiles[name] = EncoderProfile(name, preset, int(crf), audio_bitrate, opus_compression)
+    
+    if selected != "auto" and selected not in profiles:
+        raise ValueError(f"ENCODER_PROFILE must be auto or one of: {', '.join(profiles)}")
+    return profiles
+
+
+def threads_per_job(slots: int) -> int:
+    cores = os.cpu_count() or 1
+    return max(cores // max(slots, 1), 1)
@@ -0,0 +1,73 @@
+import asyncio
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from bot.services.jobs import Job
+
+
+@dataclass(eq=False)
+class ActiveJob:
+    user_id: int
+    kind: str
+    task: asyncio.Task = field(repr=False)
+    job_id: str = ""
+    job: Job | None = field(default=None, repr=False)
+    cancelled: bool = False
+    interrupted: bool = False
+    running: bool = False
+
+
+class JobRegistry:
+    
+    def __init__(self):
+        self._jobs: dict[int, set[ActiveJob]] = {}
+
+    @contextmanager
+    def register(self, user_id: int, kind: str, job_id: str = "", job: Job | None = None) -> Iterator[ActiveJob]:
+        active = ActiveJob(user_id=user_id, kind=kind, task=asyncio.current_task(), job_id=job_id, job=job)
+        self._jobs.setdefault(user_id, set()).add(active)
+        try:
+            yield active
+        finally:
+            jobs = self._jobs.get(user_id)
+            if jobs is not None:
+                jobs.discard(active)
+                if not jobs:
+                    del self._jobs[user_id]
+    
+    def cancel_user(self, user_id: int) -> int:
+        jobs = self._jobs.get(user_id, set())
+        for job in jobs:
+            job.cancelled = True
+            job.task.cancel()
+        return len(jobs)
+    
+    def cancel_job(self, job_id: str) -> bool:
+        found = False
+        for jobs in self._jobs.values():
+            for job in jobs:
+                if job.job_id == job_id and not job.cancelled:
+                    job.cancelled = True
+                    job.task.cancel()
+                    found = True
+        return found
+    
+    def interrupt_all(self, waiting_only: bool = False) -> list[ActiveJob]:
+        jobs = [
+            job for jobs in self._jobs.values() for job in jobs
+            if not job.cancelled and not (waiting_only and job.running)
+        ]
+        for job in jobs:
+            job.interrupted = True
+            job.task.cancel()
+        return jobs
+    
+    def user_jobs(self, user_id: int) -> int:
+        return len(self._jobs.get(user_id, ()))
+    
+    def __len__(self) -> int:
+        return sum(len(jobs) for jobs in self._jobs.values())
+
+
+registry = JobRegistry()
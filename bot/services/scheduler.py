@@ -0,0 +1,227 @@
+import asyncio
+import bisect
+import itertools
+from dataclasses import dataclass, field
+
+from bot.config import config
+from bot.services.profiles import (
+    EncoderProfile,
+    PROFILE_BALANCED,
+    PROFILE_FAST,
+    PROFILE_QUALITY,
+    load_profiles,
+    threads_per_job,
+)
+
+LANE_VIDEO = "video"
+LANE_AUDIO = "audio"
+
+REFERENCE_PIXELS = 1280 * 720
+VIDEO_COST_PER_SECOND = 1.0
+AUDIO_COST_PER_SECOND = 0.05
+VIDEO_BYTES_PER_SECOND = 128 * 1024
+AUDIO_BYTES_PER_SECOND = 16 * 1024
+
+
+def estimate_cost(
+    lane: str,
+    duration: float,
+    width: int = 0,
+    height: int = 0,
+    file_size: int = 0,
+    max_duration: float = 0
+) -> float:
+    if duration <= 0:
+        bytes_per_second = VIDEO_BYTES_PER_SECOND if lane == LANE_VIDEO else AUDIO_BYTES_PER_SECOND
+        duration = file_size / bytes_per_second if file_size else 1
+    
+    if max_duration > 0:
+        duration = min(duration, max_duration)
+    
+    if lane == LANE_AUDIO:
+        return max(duration * AUDIO_COST_PER_SECOND, 0.1)
+    
+    scale = (width * height) / REFERENCE_PIXELS if width and height else 1.0
+    return max(duration * VIDEO_COST_PER_SECOND * max(scale, 0.25), 1.0)
+
+
+@dataclass
+class Ticket:
+    user_id: int
+    lane: str
+    cost: float
+    round: int
+    seq: int
+    started: asyncio.Future = field(repr=False)
+    extra: dict[str, int] = field(default_factory=dict)
+    
+    def sort_key(self) -> tuple[int, int]:
+        return self.round, self.seq
+    
+    def __lt__(self, other: "Ticket") -> bool:
+        return self.sort_key() < other.sort_key()
+
+
+@dataclass
+class Lane:
+    name: str
+    slots: int
+    capacity: float
+    running: int = 0
+    used: float = 0.0
+    waiting: list[Ticket] = field(default_factory=list)
+
+
+class JobScheduler:
+    
+    def __init__(
+        self,
+        lanes: dict[str, tuple[int, float]],
+        per_user_limit: int,
+        profiles: dict[str, EncoderProfile] | None = None
+    ):
+        self.lanes = {
+            name: Lane(name=name, slots=slots, capacity=capacity)
+            for name, (slots, capacity) in lanes.items()
+        }
+        self.per_user_limit = per_user_limit
+        self.profiles = profiles or load_profiles("")
+        self._running_by_user: dict[int, int] = {}
+        self._queued_by_user: dict[int, int] = {}
+        self._seq = itertools.count()
+    
+    def submit(self, user_id: int, lane: str, cost: float) -> Ticket:
+        user_round = self._running_by_user.get(user_id, 0) + self._queued_by_user.get(user_id, 0)
+        ticket = Ticket(
+            user_id=user_id,
+            lane=lane,
+            cost=cost,
+            round=user_round // max(self.per_user_limit, 1),
+            seq=next(self._seq),
+            started=asyncio.get_running_loop().create_future()
+        )
+        self._queued_by_user[user_id] = self._queued_by_user.get(user_id, 0) + 1
+        bisect.insort(self.lanes[lane].waiting, ticket)
+        self._dispatch(self.lanes[lane])
+        return ticket
+    
+    def position(self, ticket: Ticket) -> int:
+        if ticket.started.done():
+            return 0
+        waiting = self.lanes[ticket.lane].waiting
+        return bisect.bisect_left(waiting, ticket) + 1
+    
+    async def wait(self, ticket: Ticket):
+        await asyncio.shield(ticket.started)
+    
+    def release(self, ticket: Ticket):
+        if not ticket.started.done():
+            self._remove_waiting(ticket)
+            return
+        
+        self.give_back(ticket)
+        lane = self.lanes[ticket.lane]
+        lane.running -= 1
+        lane.used -= ticket.cost
+        self._decrement(self._running_by_user, ticket.user_id)
+        for other in self.lanes.values():
+            self._dispatch(other)
+    
+    def select_profile(self, lane: str) -> EncoderProfile:
+        if config.encoder_profile != "auto":
+            return self.profiles[config.encoder_profile]
+        
+        queue_depth = self.queue_depth(lane)
+        if queue_depth >= config.profile_fast_queue:
+            return self.profiles[PROFILE_FAST]
+        if queue_depth >= config.profile_balanced_queue:
+            return self.profiles[PROFILE_BALANCED]
+        return self.profiles[PROFILE_QUALITY]
+    
+    def threads_per_job(self) -> int:
+        return threads_per_job(sum(item.slots for item in self.lanes.values()))
+    
+    def borrow(self, ticket: Ticket, count: int) -> int:
+        if self.queue_depth() or not ticket.started.done():
+            return 0
+        
+        granted = 0
+        for lane in sorted(self.lanes.values(), key=lambda item: item.name != ticket.lane):
+            take = min(count - granted, max(lane.slots - lane.running, 0))
+            if take > 0:
+                lane.running += take
+                ticket.extra[lane.name] = ticket.extra.get(lane.name, 0) + take
+                granted += take
+        return granted
+    
+    def give_back(self, ticket: Ticket):
+        if not ticket.extra:
+            return
+        
+        for name, count in ticket.extra.items():
+            self.lanes[name].running -= count
+        ticket.extra.clear()
+        for lane in self.lanes.values():
+            self._dispatch(lane)
+    
+    def queue_depth(self, lane: str | None = None) -> int:
+        if lane is not None:
+            return len(self.lanes[lane].waiting)
+        return sum(len(item.waiting) for item in self.lanes.values())
+    
+    def running(self, lane: str | None = None) -> int:
+        if lane is not None:
+            return self.lanes[lane].running
+        return sum(item.running for item in self.lanes.values())
+    
+    def _remove_waiting(self, ticket: Ticket):
+        waiting = self.lanes[ticket.lane].waiting
+        index = bisect.bisect_left(waiting, ticket)
+        if index < len(waiting) and waiting[index] is ticket:
+            del waiting[index]
+            self._decrement(self._queued_by_user, ticket.user_id)
+        ticket.started.cancel()
+        self._dispatch(self.lanes[ticket.lane])
+    
+    def _dispatch(self, lane: Lane):
+        index = 0
+        while index < len(lane.waiting) and lane.running < lane.slots:
+            ticket = lane.waiting[index]
+            
+            if self._running_by_user.get(ticket.user_id, 0) >= self.per_user_limit:
+                index += 1
+                continue
+            
+            if lane.running > 0 and lane.used + ticket.cost > lane.capacity:
+                break
+            
+            del lane.waiting[index]
+            lane.running += 1
+            lane.used += ticket.cost
+            self._decrement(self._queued_by_user, ticket.user_id)
+            self._running_by_user[ticket.user_id] = self._running_by_user.get(ticket.user_id, 0) + 1
+            ticket.started.set_result(None)
+
+    @staticmethod
+    def _decrement(counter: dict[int, int], user_id: int):
+        value = counter.get(user_id, 0) - 1
+        if value > 0:
+            counter[user_id] = value
+        else:
+            counter.pop(user_id, None)
+
+
+def create_scheduler() -> JobScheduler:
+    audio_slots = min(config.audio_lane_slots, max(config.max_concurrent_tasks - 1, 1))
+    video_slots = max(config.max_concurrent_tasks - audio_slots, 1)
+    return JobScheduler(
+        lanes={
+            LANE_VIDEO: (video_slots, config.video_lane_capacity or video_slots * 60.0),
+            LANE_AUDIO: (audio_slots, config.audio_lane_capacity or audio_slots * 30.0),
+        },
+        per_user_limit=config.per_user_job_limit,
+        profiles=load_profiles(config.encoder_profiles, config.encoder_profile)
+    )
+
+
+scheduler = create_scheduler()
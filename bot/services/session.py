@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import random
+from pathlib import Path
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.client.telegram import (
+    PRODUCTION,
+    BareFilesPathWrapper,
+    SimpleFilesPathWrapper,
+    TelegramAPIServer,
+)
+from aiogram.enums import ParseMode
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from bot.config import config
+from bot.services.metrics import api_retries_total
+from bot.services.outbound import gateway
+from bot.utils.stream_file import StreamInputFile
+
+logger = logging.getLogger(__name__)
+
+CONNECTIONS_PER_JOB = 2
+SPARE_CONNECTIONS = 8
+RETRY_BASE_DELAY = 0.5
+
+
+def retry_delay(attempt: int) -> float:
+    delay = min(RETRY_BASE_DELAY * 2 ** attempt, config.api_retry_max_delay)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def replayable(method: TelegramMethod) -> bool:
+    return not any(isinstance(getattr(method, name, None), StreamInputFile) for name in type(method).model_fields)
+
+
+class RetryMiddleware(BaseRequestMiddleware):
+    
+    def __init__(self, retries: int, max_delay: float):
+        self.retries = retries
+        self.max_delay = max_delay
+    
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType]
+    ) -> Response[TelegramType]:
+        name = method.__api_method__
+        attempt = 0
+        while True:
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if attempt >= self.retries or e.retry_after > self.max_delay or not replayable(method):
+                    raise
+                reason, delay = "flood", e.retry_after
+            except TelegramServerError:
+                if attempt >= self.retries or not replayable(method):
+                    raise
+                reason, delay = "server", retry_delay(attempt)
+            except TelegramNetworkError:
+                if attempt >= self.retries or not replayable(method) or name.startswith("send"):
+                    raise
+                reason, delay = "network", retry_delay(attempt)
+            
+            attempt += 1
+            api_retries_total.inc(method=name, reason=reason)
+            logger.info("Retrying %s in %.1fs after %s error (attempt %d)", name, delay, reason, attempt)
+            await asyncio.sleep(delay)
+
+
+class PooledSession(AiohttpSession):
+    
+    def __init__(self, api: TelegramAPIServer, limit: int, keepalive_timeout: float, timeout: float):
+        super().__init__(api=api, limit=limit, timeout=timeout)
+        self._connector_init["limit_per_host"] = limit
+        self._connector_init["keepalive_timeout"] = keepalive_timeout
+
+
+def create_api_server() -> TelegramAPIServer:
+    if not config.bot_api_url:
+        return PRODUCTION
+    
+    wrapper = BareFilesPathWrapper()
+    if config.bot_api_server_dir and config.bot_api_local_dir:
+        wrapper = SimpleFilesPathWrapper(Path(config.bot_api_server_dir), Path(config.bot_api_local_dir))
+    return TelegramAPIServer.from_base(config.bot_api_url, is_local=config.bot_api_local, wrap_local_file=wrapper)
+
+
+def pool_size() -> int:
+    if config.api_pool_size:
+        return config.api_pool_size
+    jobs = max(config.worker_concurrency, config.max_concurrent_tasks)
+    return jobs * max(CONNECTIONS_PER_JOB, config.download_connections + 1) + SPARE_CONNECTIONS
+
+
+def create_session() -> PooledSession:
+    session = PooledSession(
+        api=create_api_server(),
+        limit=pool_size(),
+        keepalive_timeout=config.api_keepalive,
+        timeout=config.api_timeout
+    )
+    session.middleware(RetryMiddleware(config.api_retries, config.api_retry_max_delay))
+    session.middleware(gateway)
+    return session
+
+
+def create_bot() -> Bot:
+    return Bot(
+        token=config.bot_token,
+        session=create_session(),
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML)
+    )
@@ -0,0 +1,36 @@
+import asyncio
+from contextlib import contextmanager
+from typing import Generic, Iterator, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    
+    def __init__(self):
+        self._flights: dict[str, asyncio.Future] = {}
+    
+    def leading(self, key: str) -> bool:
+        return key in self._flights
+    
+    async def wait(self, key: str) -> T | None:
+        while (flight := self._flights.get(key)) is not None:
+            result = await asyncio.shield(flight)
+            if result is not None:
+                return result
+        return None
+
+    @contextmanager
+    def lead(self, key: str) -> Iterator[asyncio.Future]:
+        flight = asyncio.get_running_loop().create_future()
+        self._flights[key] = flight
+        try:
+            yield flight
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            if not flight.done():
+                flight.set_result(None)
+    
+    def __len__(self) -> int:
+        return len(self._flights)
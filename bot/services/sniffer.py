@@ -0,0 +1,96 @@
+import dataclasses
+import logging
+
+from aiogram import Bot
+
+from bot.config import config
+from bot.services.jobs import KIND_CIRCLE, KIND_EXTRACT
+from bot.services.pipeline import converter
+from bot.services.probe import MediaProbe
+from bot.utils.media_detect import (
+    AUDIO_CONTAINERS,
+    HEADER_DURATION_CONTAINERS,
+    MediaFile,
+    header_duration,
+    is_non_media,
+    sniff_container,
+)
+from bot.utils.stream_file import read_head
+
+logger = logging.getLogger(__name__)
+
+NOT_MEDIA_TEXT = "Файл не похож на видео или аудио. Отправьте его в другом формате."
+NO_VIDEO_TEXT = "В файле нет видеодорожки."
+NO_AUDIO_TEXT = "В файле нет звука."
+NO_AUDIO_IN_VIDEO_TEXT = "Видео не содержит аудиодорожки"
+UNKNOWN_CODEC_TEXT = "Не удалось распознать кодек файла. Отправьте его в другом формате."
+
+NON_MEDIA_FORMATS = {"tty", "image2", "lrc", "srt", "ass", "webvtt"}
+
+
+def needs_sniff(media: MediaFile) -> bool:
+    return config.sniff_kb > 0 and not media.duration
+
+
+def not_media_format(media_probe: MediaProbe) -> bool:
+    formats = set(media_probe.format_name.split(","))
+    return bool(formats & NON_MEDIA_FORMATS) or any(name.endswith("_pipe") for name in formats)
+
+
+def container_error(kind: str, container: str | None, head: bytes) -> str | None:
+    if container is None and is_non_media(head):
+        return NOT_MEDIA_TEXT
+    if kind == KIND_CIRCLE and container in AUDIO_CONTAINERS:
+        return NO_VIDEO_TEXT
+    return None
+
+
+def sniff_error(kind: str, container: str | None, media_probe: MediaProbe | None) -> str | None:
+    if media_probe is None:
+        return NOT_MEDIA_TEXT if container is None else None
+    if container is None and not_media_format(media_probe):
+        return NOT_MEDIA_TEXT
+    
+    stream = media_probe.video if kind == KIND_CIRCLE else media_probe.audio
+    if stream is None:
+        if kind == KIND_CIRCLE:
+            return NO_VIDEO_TEXT
+        return NO_AUDIO_IN_VIDEO_TEXT if kind == KIND_EXTRACT else NO_AUDIO_TEXT
+    if not stream.codec_name or stream.codec_name == "none":
+        return UNKNOWN_CODEC_TEXT
+    return None
+
+
+async def sniff_media(bot: Bot, kind: str, media: MediaFile) -> tuple[MediaFile, MediaProbe | None, str | None]:
+    try:
+        file = await bot.get_file(media.file_id)
+        head = await read_head(bot, file.file_path, config.sniff_kb * 1024)
+    except Exception as e:
+        logger.info("Skipping sniff of %s: %s", media.file_unique_id, e)
+        return media, None, None
+    
+    container = sniff_container(head)
+    error = container_error(kind, container, head)
+    if error is None:
+        try:
+            media_probe = await converter.probe_head(head)
+        except Exception as e:
+            logger.info("Header probe of %s failed: %s", media.file_unique_id, e)
+            return media, None, None
+        error = sniff_error(kind, container, media_probe)
+    
+    if error is not None:
+        logger.info("Rejected %s before download: container=%s %s", media.file_unique_id, container, error)
+        return media, None, error
+    if media_probe is None:
+        return media, None, None
+    
+    if container not in HEADER_DURATION_CONTAINERS:
+        media_probe = dataclasses.replace(media_probe, duration=0.0)
+    width, height = media_probe.resolution
+    return dataclasses.replace(
+        media,
+        duration=header_duration(container, media_probe.duration),
+        width=media.width or width,
+        height=media.height or height
+    ), media_probe, None
@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import os
+import signal
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+@dataclass(frozen=True)
+class ProcessLimits:
+    cpu_seconds: int = 0
+    memory_bytes: int = 0
+    nice: int = 0
+
+
+class ProcessSupervisor:
+    
+    def __init__(self, limits: ProcessLimits | None = None):
+        self.limits = limits or ProcessLimits()
+        self.running: set[asyncio.subprocess.Process] = set()
+        self._reapers: set[asyncio.Task] = set()
+    
+    def _apply_limits(self, pid: int):
+        try:
+            if self.limits.nice:
+                priority = os.getpriority(os.PRIO_PROCESS, 0) + self.limits.nice
+                os.setpriority(os.PRIO_PROCESS, pid, priority)
+            if resource is None:
+                return
+            if self.limits.cpu_seconds:
+                resource.prlimit(pid, resource.RLIMIT_CPU, (self.limits.cpu_seconds, self.limits.cpu_seconds + 5))
+            if self.limits.memory_bytes:
+                resource.prlimit(pid, resource.RLIMIT_AS, (self.limits.memory_bytes, self.limits.memory_bytes))
+        except ProcessLookupError:
+            pass
+    
+    async def spawn(self, *cmd: str, **kwargs) -> asyncio.subprocess.Process:
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            start_new_session=True,
+            **kwargs
+        )
+        self._apply_limits(process.pid)
+        self.running.add(process)
+        reaper = asyncio.create_task(self._reap(process))
+        self._reapers.add(reaper)
+        reaper.add_done_callback(self._reapers.discard)
+        return process
+    
+    async def _reap(self, process: asyncio.subprocess.Process):
+        try:
+            await process.wait()
+        finally:
+            self.running.discard(process)
+    
+    def kill(self, process: asyncio.subprocess.Process):
+        if process.returncode is not None:
+            return
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        except PermissionError:
+            process.kill()
+    
+    def kill_all(self):
+        for process in list(self.running):
+            self.kill(process)
+        if self.running:
+            logger.info("Killed %d ffmpeg processes", len(self.running))
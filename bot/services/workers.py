@@ -0,0 +1,150 @@
+import asyncio
+import logging
+
+from aiogram import Bot
+
+from bot.config import config
+from bot.services.job_queue import POLL_INTERVAL, MemoryJobQueue, SQLiteJobQueue, job_queue
+from bot.services.jobs import Job
+from bot.services.pipeline import execute, reply
+from bot.services.registry import registry
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerPool:
+    
+    def __init__(
+        self,
+        bot: Bot,
+        queue: MemoryJobQueue | SQLiteJobQueue,
+        concurrency: int,
+        lease_timeout: int,
+        max_attempts: int
+    ):
+        self.bot = bot
+        self.queue = queue
+        self.concurrency = concurrency
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        self._tasks: list[asyncio.Task] = []
+        self._watcher: asyncio.Task | None = None
+        self._busy: set[int] = set()
+        self._running: set[str] = set()
+        self.paused = False
+
+    @property
+    def alive(self) -> bool:
+        return bool(self._tasks) and not any(task.done() for task in self._tasks)
+
+    @property
+    def busy(self) -> bool:
+        return bool(self._busy)
+    
+    def pause(self):
+        self.paused = True
+        for index, task in enumerate(self._tasks):
+            if index not in self._busy:
+                task.cancel()
+    
+    def start(self):
+        self._tasks = [asyncio.create_task(self._run(index)) for index in range(self.concurrency)]
+        self._watcher = asyncio.create_task(self._watch_cancellations())
+        logger.info("Started %d workers", self.concurrency)
+    
+    async def stop(self):
+        tasks = [*self._tasks, self._watcher] if self._watcher is not None else self._tasks
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._watcher = None
+    
+    async def _run(self, index: int):
+        while not self.paused:
+            job = await self.queue.get()
+            logger.info("Worker %d took job %s: kind=%s attempt=%d", index, job.job_id, job.kind, job.attempts)
+            self._busy.add(index)
+            try:
+                await self._handle(job)
+            finally:
+                self._busy.discard(index)
+    
+    async def _handle(self, job: Job):
+        if job.attempts > self.max_attempts:
+            logger.warning("Dropping job %s after %d attempts", job.job_id, job.attempts - 1)
+            try:
+                await reply(self.bot, job, "Не удалось обработать файл. Попробуйте отправить его ещё раз.")
+            except Exception as e:
+                logger.warning("Failed to notify user about dropped job %s: %s", job.job_id, e)
+            await self.queue.ack(job)
+            return
+        
+        execution = asyncio.create_task(execute(self.bot, job))
+        heartbeat = asyncio.create_task(self._heartbeat(job, execution))
+        self._running.add(job.job_id)
+        try:
+            await execution
+        except asyncio.CancelledError:
+            if heartbeat.done() and not heartbeat.cancelled() and heartbeat.result():
+                logger.info("Abandoned job %s after losing its lease", job.job_id)
+                return
+            await asyncio.shield(self.queue.release(job))
+            raise
+        except Exception:
+            logger.exception("Job %s failed, releasing for redelivery", job.job_id)
+            await self.queue.release(job)
+            return
+        finally:
+            heartbeat.cancel()
+            self._running.discard(job.job_id)
+        
+        await self.queue.ack(job)
+    
+    async def _heartbeat(self, job: Job, execution: asyncio.Task) -> bool:
+        interval = max(self.lease_timeout / 3, 1)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                alive = await self.queue.touch(job)
+                cancelled = not alive and bool(await self.queue.cancelled_ids([job.job_id]))
+            except Exception as e:
+                logger.warning("Failed to extend lease of job %s: %s", job.job_id, e)
+                continue
+            if cancelled:
+                self._cancel(job.job_id)
+                return False
+            if not alive:
+                logger.info("Job %s lost its lease, leaving it to the next attempt", job.job_id)
+                execution.cancel()
+                return True
+    
+    def _cancel(self, job_id: str):
+        if job_id not in self._running:
+            return
+        self._running.discard(job_id)
+        logger.info("Job %s was cancelled", job_id)
+        registry.cancel_job(job_id)
+    
+    async def _watch_cancellations(self):
+        while True:
+            await asyncio.sleep(POLL_INTERVAL)
+            if not self._running:
+                continue
+            try:
+                cancelled = await self.queue.cancelled_ids(list(self._running))
+            except Exception as e:
+                logger.warning("Failed to check for cancelled jobs: %s", e)
+                continue
+            for job_id in cancelled:
+                self._cancel(job_id)
+
+
+def create_worker_pool(bot: Bot) -> WorkerPool:
+    return WorkerPool(
+        bot,
+        job_queue,
+        config.worker_concurrency or config.max_concurrent_tasks,
+        config.job_lease_timeout,
+        config.job_max_attempts
+    )
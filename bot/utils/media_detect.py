@@ -1,8 +1,49 @@
+from dataclasses import dataclass
 from pathlib import Path
 
 VIDEO_EXTENSIONS = {".mp4", ".mov", ".avi", ".mkv", ".webm", ".m4v", ".3gp", ".flv"}
 AUDIO_EXTENSIONS = {".mp3", ".wav", ".m4a", ".ogg", ".flac", ".aac", ".wma", ".opus"}
 
+STREAMABLE_EXTENSIONS = {".mkv", ".webm", ".flv", ".mp3", ".ogg", ".opus", ".wav", ".flac", ".aac"}
+MP4_EXTENSIONS = {".mp4", ".mov", ".m4v", ".m4a", ".3gp"}
+OPUS_EXTENSIONS = {".ogg", ".opus", ".oga", ".webm", ".mkv"}
+
+CONTAINER_SIGNATURES = [
+    (0, b"\x1a\x45\xdf\xa3", "matroska"),
+    (0, b"OggS", "ogg"),
+    (0, b"fLaC", "flac"),
+    (0, b"ID3", "mp3"),
+    (0, b"FLV", "flv"),
+    (0, b"#!AMR", "amr"),
+    (0, b"\x30\x26\xb2\x75\x8e\x66\xcf\x11", "asf"),
+    (0, b"\x00\x00\x01\xba", "mpeg"),
+    (4, b"ftyp", "mp4"),
+    (4, b"moov", "mp4"),
+    (4, b"mdat", "mp4"),
+    (4, b"free", "mp4"),
+    (4, b"wide", "mp4"),
+    (4, b"skip", "mp4"),
+]
+RIFF_FORMATS = {b"WAVE": "wav", b"AVI ": "avi"}
+AUDIO_CONTAINERS = {"mp3", "aac", "flac", "wav", "amr"}
+HEADER_DURATION_CONTAINERS = {"mp4", "matroska", "asf", "avi", "wav", "flac"}
+MPEG_TS_PACKET = 188
+
+NON_MEDIA_SIGNATURES = (
+    b"\xff\xd8\xff",
+    b"\x89PNG",
+    b"GIF8",
+    b"%PDF",
+    b"PK\x03\x04",
+    b"Rar!",
+    b"7z\xbc\xaf",
+    b"\x1f\x8b",
+    b"\x7fELF",
+    b"MZ",
+    b"<",
+    b"{",
+)
+
 VIDEO_MIME_PREFIXES = ("video/",)
 AUDIO_MIME_PREFIXES = ("audio/",)
 
@@ -39,3 +80,87 @@ def get_extension(filename: str | None, default: str) -> str:
         if ext:
             return ext
     return default
+
+
+def mp4_moov_first(head: bytes) -> bool:
+    offset = 0
+    while offset + 8 <= len(head):
+        size = int.from_bytes(head[offset:offset + 4], "big")
+        box_type = head[offset + 4:offset + 8]
+        
+        if box_type == b"moov":
+            return True
+        if box_type == b"mdat":
+            return False
+        
+        if size == 1:
+            if offset + 16 > len(head):
+                return False
+            size = int.from_bytes(head[offset + 8:offset + 16], "big")
+        if size < 8:
+            return False
+        offset += size
+    
+    return False
+
+
+def sniff_container(head: bytes) -> str | None:
+    for offset, signature, container in CONTAINER_SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            return container
+    
+    if head[:4] == b"RIFF" and head[8:12] in RIFF_FORMATS:
+        return RIFF_FORMATS[head[8:12]]
+    if len(head) > MPEG_TS_PACKET and head[0] == 0x47 and head[MPEG_TS_PACKET] == 0x47:
+        return "mpegts"
+    if len(head) >= 2 and head[0] == 0xFF:
+        if head[1] & 0xF6 == 0xF0:
+            return "aac"
+        if head[1] & 0xE0 == 0xE0:
+            return "mp3"
+    return None
+
+
+def header_duration(container: str | None, seconds: float) -> int:
+    if container not in HEADER_DURATION_CONTAINERS:
+        return 0
+    return int(seconds)
+
+
+def is_non_media(head: bytes) -> bool:
+    return not head or head.lstrip().startswith(NON_MEDIA_SIGNATURES)
+
+
+def may_contain_opus(extension: str) -> bool:
+    return extension in OPUS_EXTENSIONS
+
+
+def can_stream_input(extension: str, head: bytes) -> bool:
+    if extension in STREAMABLE_EXTENSIONS:
+        return True
+    if extension in MP4_EXTENSIONS:
+        return mp4_moov_first(head)
+    return False
+
+
+@dataclass
+class MediaFile:
+    file_id: str
+    file_unique_id: str
+    file_size: int
+    filename: str | None = None
+    duration: int = 0
+    width: int = 0
+    height: int = 0
+
+    @classmethod
+    def from_telegram(cls, media) -> "MediaFile":
+        return cls(
+            file_id=media.file_id,
+            file_unique_id=media.file_unique_id,
+            file_size=media.file_size or 0,
+            filename=getattr(media, "file_name", None),
+            duration=getattr(media, "duration", None) or 0,
+            width=getattr(media, "width", None) or 0,
+            height=getattr(media, "height", None) or 0,
+        )
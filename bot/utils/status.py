@@ -0,0 +1,149 @@
+import asyncio
+import html
+import logging
+import time
+
+from aiogram import Bot
+from aiogram.types import Message
+
+from bot.config import config
+
+logger = logging.getLogger(__name__)
+
+BATCH_LINE_LIMIT = 200
+
+_last_edit_at: dict[int, float] = {}
+
+
+def _prune(now: float):
+    if len(_last_edit_at) < 1024:
+        return
+    for chat_id, edited_at in list(_last_edit_at.items()):
+        if now - edited_at > config.status_edit_interval:
+            del _last_edit_at[chat_id]
+
+
+class StatusMessage:
+    
+    def __init__(self, bot: Bot, chat_id: int, message_id: int, text: str = ""):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.text = text
+        self._pending: str | None = None
+        self._flush_task: asyncio.Task | None = None
+
+    @classmethod
+    def from_message(cls, bot: Bot, message: Message) -> "StatusMessage":
+        _last_edit_at[message.chat.id] = time.monotonic()
+        return cls(bot, message.chat.id, message.message_id, message.text or "")
+    
+    async def set(self, text: str):
+        self._pending = None
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self._edit(text)
+    
+    def update(self, text: str):
+        self._pending = text
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush())
+    
+    async def _flush(self):
+        try:
+            last_edit_at = _last_edit_at.get(self.chat_id, 0.0)
+            delay = last_edit_at + config.status_edit_interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            
+            text, self._pending = self._pending, None
+            if text is not None:
+                await self._edit(text)
+        except Exception as e:
+            logger.debug("Status update failed: %s", e)
+        finally:
+            if self._flush_task is asyncio.current_task():
+                self._flush_task = None
+    
+    async def _edit(self, text: str):
+        if text == self.text:
+            return
+        
+        now = time.monotonic()
+        _prune(now)
+        _last_edit_at[self.chat_id] = now
+        await self.bot.edit_message_text(text, chat_id=self.chat_id, message_id=self.message_id)
+        self.text = text
+
+
+class BatchStatus:
+    
+    def __init__(self, status: StatusMessage, titles: list[str]):
+        self.status = status
+        self.titles = titles
+        self.lines = [""] * len(titles)
+        self.done = 0
+    
+    def item(self, index: int) -> "BatchItemStatus":
+        return BatchItemStatus(self, index)
+    
+    def set_line(self, index: int, text: str):
+        self.lines[index] = " ".join(text.split())[:BATCH_LINE_LIMIT]
+        self.status.update(self.render())
+    
+    def mark_done(self):
+        self.done += 1
+        self.status.update(self.render())
+    
+    def render(self, header: str | None = None) -> str:
+        total = len(self.titles)
+        if header is None:
+            header = f"Обрабатываю файлы: готово {self.done} из {total}"
+        lines = [header, ""]
+        for index, (title, line) in enumerate(zip(self.titles, self.lines), 1):
+            prefix = f"{index}. {html.escape(title, quote=False)}" if title else f"{index}."
+            lines.append(f"{prefix} — {html.escape(line, quote=False)}" if line else prefix)
+        return "\n".join(lines)
+    
+    async def finish(self, header: str):
+        await self.status.set(self.render(header))
+
+
+class BatchItemStatus:
+    
+    def __init__(self, batch: BatchStatus, index: int):
+        self.batch = batch
+        self.index = index
+    
+    async def set(self, text: str):
+        self.batch.set_line(self.index, text)
+    
+    def update(self, text: str):
+        self.batch.set_line(self.index, text)
+
+
+def format_eta(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 60:
+        return f"{seconds // 60} мин {seconds % 60} с"
+    return f"{seconds} с"
+
+
+def format_position(seconds: int) -> str:
+    hours, rest = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+def progress_text(title: str, done: float, total: float, speed: float) -> str:
+    if total <= 0:
+        return title
+    
+    percent = min(int(done * 100 / total), 99)
+    text = f"{title}\n{percent}%"
+    if speed > 0:
+        text += f", осталось ~{format_eta(max(total - done, 0) / speed)}"
+    return text
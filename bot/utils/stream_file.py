@@ -0,0 +1,240 @@
+import asyncio
+import logging
+import os
+from collections import deque
+from dataclasses import dataclass, field
+from typing import AsyncIterator
+
+import aiohttp
+from aiogram import Bot
+from aiogram.types import InputFile
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class RangeNotSupported(Exception):
+    pass
+
+
+class DownloadError(Exception):
+    pass
+
+
+@dataclass
+class ByteRange:
+    start: int
+    end: int
+    offset: int = field(init=False)
+    
+    def __post_init__(self):
+        self.offset = self.start
+
+    @property
+    def done(self) -> bool:
+        return self.offset > self.end
+
+
+class StreamInputFile(InputFile):
+    
+    def __init__(self, stream: AsyncIterator[bytes], filename: str):
+        super().__init__(filename=filename)
+        self.stream = stream
+    
+    async def read(self, bot: Bot) -> AsyncIterator[bytes]:
+        async for chunk in self.stream:
+            yield chunk
+
+
+async def prepend(head: bytes, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    if head:
+        yield head
+    async for chunk in chunks:
+        yield chunk
+
+
+def retryable(error: Exception) -> bool:
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status >= 500 or error.status == 429
+    return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError))
+
+
+async def stream_download(
+    bot: Bot,
+    file_path: str,
+    chunk_size: int = 64 * 1024,
+    timeout: int = 600,
+    retries: int = 0,
+    retry_delay: float = 1.0
+) -> AsyncIterator[bytes]:
+    url = bot.session.api.file_url(bot.token, file_path)
+    attempt = 0
+    while True:
+        received = False
+        try:
+            async for chunk in bot.session.stream_content(
+                url=url,
+                timeout=timeout,
+                chunk_size=chunk_size,
+                raise_for_status=True
+            ):
+                received = True
+                yield chunk
+            return
+        except Exception as e:
+            if received or attempt >= retries or not retryable(e):
+                raise
+            attempt += 1
+            logger.info("Retrying download in %.1fs after %s (attempt %d)", retry_delay * attempt, e, attempt)
+            await asyncio.sleep(retry_delay * attempt)
+
+
+def split_ranges(start: int, size: int, part_size: int) -> list[ByteRange]:
+    return [
+        ByteRange(offset, min(offset + part_size, size) - 1)
+        for offset in range(start, size, max(part_size, 1))
+    ]
+
+
+def range_total(response: aiohttp.ClientResponse) -> int | None:
+    total = response.headers.get("Content-Range", "").rpartition("/")[2]
+    return int(total) if total.isdigit() else None
+
+
+async def fetch_range(session: aiohttp.ClientSession, url: str, fd: int, part: ByteRange, size: int, timeout: int):
+    async with session.get(
+        url,
+        headers={"Range": f"bytes={part.offset}-{part.end}"},
+        timeout=aiohttp.ClientTimeout(total=timeout)
+    ) as response:
+        if response.status == 416:
+            raise DownloadError(f"Server has fewer than {size} bytes")
+        response.raise_for_status()
+        if response.status != 206:
+            raise RangeNotSupported(f"Server answered {response.status} to a range request")
+        total = range_total(response)
+        if total is not None and total != size:
+            raise DownloadError(f"Server has {total} bytes, expected {size}")
+        async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+            if part.offset + len(chunk) > part.end + 1:
+                raise DownloadError(f"Server sent more than bytes {part.start}-{part.end}")
+            os.pwrite(fd, chunk, part.offset)
+            part.offset += len(chunk)
+    
+    if not part.done:
+        raise aiohttp.ClientPayloadError(f"Range {part.start}-{part.end} ended at {part.offset}")
+
+
+async def fetch_with_resume(
+    session: aiohttp.ClientSession,
+    url: str,
+    fd: int,
+    part: ByteRange,
+    size: int,
+    timeout: int,
+    retries: int,
+    retry_delay: float
+):
+    attempt = 0
+    while True:
+        try:
+            await fetch_range(session, url, fd, part, size, timeout)
+            return
+        except RangeNotSupported:
+            raise
+        except Exception as e:
+            if attempt >= retries or not retryable(e):
+                raise
+            attempt += 1
+            logger.info(
+                "Resuming bytes %d-%d at %d in %.1fs after %s (attempt %d)",
+                part.start,
+                part.end,
+                part.offset,
+                retry_delay * attempt,
+                e,
+                attempt
+            )
+            await asyncio.sleep(retry_delay * attempt)
+
+
+async def download_ranges(
+    bot: Bot,
+    file_path: str,
+    path: str,
+    size: int,
+    prefix: bytes = b"",
+    connections: int = 4,
+    part_size: int = 2 * 1024 * 1024,
+    timeout: int = 600,
+    retries: int = 0,
+    retry_delay: float = 1.0
+):
+    url = bot.session.api.file_url(bot.token, file_path)
+    session = await bot.session.create_session()
+    prefix = prefix[:size]
+    parts = split_ranges(len(prefix), size, part_size)
+    pending = deque(parts)
+    
+    async def worker():
+        while pending:
+            await fetch_with_resume(session, url, fd, pending.popleft(), size, timeout, retries, retry_delay)
+    
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        os.ftruncate(fd, size)
+        if prefix:
+            os.pwrite(fd, prefix, 0)
+        
+        workers = [asyncio.create_task(worker()) for _ in range(max(min(connections, len(parts)), 1))]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+    finally:
+        os.close(fd)
+    
+    received = len(prefix) + sum(part.offset - part.start for part in parts)
+    if received != size or os.path.getsize(path) != size:
+        raise DownloadError(f"Downloaded {received} of {size} bytes")
+
+
+async def read_head(bot: Bot, file_path: str, limit: int, timeout: int = 30) -> bytes:
+    local_path = local_file_path(bot, file_path)
+    if local_path is not None:
+        with open(local_path, "rb") as f:
+            return f.read(limit)
+    
+    head = bytearray()
+    chunks = bot.session.stream_content(
+        url=bot.session.api.file_url(bot.token, file_path),
+        headers={"Range": f"bytes=0-{limit - 1}"},
+        timeout=timeout,
+        chunk_size=min(limit, 64 * 1024),
+        raise_for_status=True
+    )
+    try:
+        async for chunk in chunks:
+            head += chunk
+            if len(head) >= limit:
+                break
+    finally:
+        await chunks.aclose()
+    return bytes(head[:limit])
+
+
+def local_file_path(bot: Bot, file_path: str) -> str | None:
+    api = bot.session.api
+    if not api.is_local:
+        return None
+    
+    try:
+        path = str(api.wrap_local_file.to_local(file_path))
+    except ValueError:
+        return None
+    if os.path.isabs(path) and os.path.isfile(path):
+        return path
+    return None
@@ -1,13 +1,23 @@
+import asyncio
+import logging
+import os
+import shutil
+import time
 import uuid
+from dataclasses import dataclass
 from pathlib import Path
 
 from bot.config import config
 
+logger = logging.getLogger(__name__)
+
+JOB_DIR_PREFIX = "job_"
+
 
 class TempFileManager:
     
-    def __init__(self):
-        self.temp_dir = Path(config.temp_dir)
+    def __init__(self, temp_dir: str | Path | None = None):
+        self.temp_dir = Path(temp_dir or config.temp_dir)
         self.temp_dir.mkdir(parents=True, exist_ok=True)
     
     def create_temp_path(self, prefix: str, extension: str) -> str:
@@ -24,3 +34,174 @@ class TempFileManager:
                 path.unlink()
             except OSError:
                 pass
+
+
+class StorageFull(Exception):
+    pass
+
+
+@dataclass(eq=False)
+class Reservation:
+    path: Path
+    size: int
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _owner_pid(name: str) -> int | None:
+    if not name.startswith(JOB_DIR_PREFIX):
+        return None
+    try:
+        return int(name[len(JOB_DIR_PREFIX):].split("_", 1)[0])
+    except ValueError:
+        return None
+
+
+def _usage(path: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.stat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class TempStorage:
+    
+    def __init__(self, root: str, quota: int, stale_after: int):
+        self.root = Path(root)
+        self.quota = quota
+        self.stale_after = stale_after
+        self.reserved = 0
+        self.high_water = 0
+        self._reservations: set[Reservation] = set()
+        self._released = asyncio.Event()
+        self._sweeper: asyncio.Task | None = None
+    
+    def _fits(self, size: int) -> bool:
+        return not self.quota or self.reserved + size <= self.quota
+    
+    async def reserve(self, size: int, timeout: float = 0) -> Reservation:
+        if self.quota and size > self.quota:
+            raise StorageFull("Файл слишком большой для обработки на этом сервере.")
+        
+        try:
+            async with asyncio.timeout(timeout or None):
+                while not self._fits(size):
+                    self._released.clear()
+                    await self._released.wait()
+        except TimeoutError:
+            raise StorageFull("Сейчас не хватает места для обработки. Попробуйте позже.") from None
+        
+        path = self.root / f"{JOB_DIR_PREFIX}{os.getpid()}_{uuid.uuid4().hex}"
+        path.mkdir(parents=True)
+        reservation = Reservation(path=path, size=size)
+        self._reservations.add(reservation)
+        self.reserved += size
+        self.high_water = max(self.high_water, self.reserved)
+        return reservation
+    
+    def shrink(self, reservation: Reservation, size: int):
+        if reservation not in self._reservations or size >= reservation.size:
+            return
+        
+        self.reserved -= reservation.size - size
+        reservation.size = size
+        self._released.set()
+    
+    def release(self, reservation: Reservation):
+        if reservation not in self._reservations:
+            return
+        
+        shutil.rmtree(reservation.path, ignore_errors=True)
+        self._reservations.discard(reservation)
+        self.reserved -= reservation.size
+        self._released.set()
+    
+    def release_all(self):
+        for reservation in list(self._reservations):
+            self.release(reservation)
+    
+    def usage(self) -> int:
+        return _usage(self.root)
+    
+    def stats(self) -> dict:
+        return {
+            "quota": self.quota,
+            "reserved": self.reserved,
+            "high_water": self.high_water,
+            "usage": self.usage(),
+            "jobs": len(self._reservations),
+        }
+    
+    def active_dirs(self) -> set[str]:
+        return {reservation.path.name for reservation in self._reservations}
+    
+    def sweep(self, active: set[str] | None = None) -> int:
+        if not self.root.exists():
+            return 0
+        
+        if active is None:
+            active = self.active_dirs()
+        now = time.time()
+        removed = 0
+        for entry in os.scandir(self.root):
+            if entry.name in active:
+                continue
+            
+            owner = _owner_pid(entry.name)
+            orphaned = owner is not None and owner != os.getpid() and not _pid_alive(owner)
+            try:
+                stale = now - entry.stat(follow_symlinks=False).st_mtime > self.stale_after
+            except OSError:
+                continue
+            if not orphaned and not stale:
+                continue
+            
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                try:
+                    os.unlink(entry.path)
+                except OSError:
+                    continue
+            removed += 1
+        
+        if removed:
+            logger.info("Swept %d stale temp entries from %s", removed, self.root)
+        return removed
+    
+    async def _sweep_periodically(self, interval: float):
+        while True:
+            try:
+                await asyncio.to_thread(self.sweep, self.active_dirs())
+            except Exception as e:
+                logger.warning("Temp sweep failed: %s", e)
+            await asyncio.sleep(interval)
+    
+    def start_sweeper(self, interval: float):
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_periodically(interval))
+    
+    async def stop_sweeper(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+
+
+temp_storage = TempStorage(
+    config.temp_dir,
+    config.temp_quota_mb * 1024 * 1024,
+    config.temp_stale_after
+)
@@ -0,0 +1,48 @@
+import asyncio
+import logging
+
+from bot.config import config
+from bot.services.drain import drain
+from bot.services.health import start_health_server
+from bot.services.job_queue import job_queue
+from bot.services.pipeline import supervisor
+from bot.services.session import create_bot
+from bot.services.workers import create_worker_pool
+from bot.utils.temp_file import temp_storage
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    if job_queue is None:
+        raise ValueError("JOB_QUEUE must be set to run workers")
+    
+    drain.install()
+    bot = create_bot()
+    
+    pool = create_worker_pool(bot)
+    logger.info("Worker starting...")
+    
+    pool.start()
+    health_server = await start_health_server(pool)
+    temp_storage.start_sweeper(config.temp_sweep_interval)
+    await drain.resume(bot)
+    try:
+        await drain.wait()
+        await drain.shutdown(pool)
+    finally:
+        await temp_storage.stop_sweeper()
+        if health_server is not None:
+            await health_server.cleanup()
+        await pool.stop()
+        supervisor.kill_all()
+        await job_queue.close()
+        await bot.session.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,14 @@
+import os
+
+import pytest
+
+os.environ.setdefault("BOT_TOKEN", "0:test")
+os.environ.setdefault("METRICS_PORT", "0")
+
+
+@pytest.fixture
+def payload(tmp_path):
+    data = os.urandom(3 * 1024 * 1024 + 12345)
+    path = tmp_path / "source.bin"
+    path.write_bytes(data)
+    return path, data
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from benchmarks.fake_bot import FakeBot, FakeSession
+from bot.utils.stream_file import DownloadError, RangeNotSupported, download_ranges
+
+PART_SIZE = 1024 * 1024
+
+
+def download(session: FakeSession, source, target, size: int, prefix: bytes = b"", retries: int = 2) -> FakeBot:
+    bot = FakeBot(session=session)
+    
+    async def run():
+        try:
+            await download_ranges(
+                bot,
+                str(source),
+                str(target),
+                size,
+                prefix,
+                connections=3,
+                part_size=PART_SIZE,
+                retries=retries,
+                retry_delay=0.01
+            )
+        finally:
+            await bot.session.close()
+    
+    asyncio.run(run())
+    return bot
+
+
+def test_ranged_download_matches_source(payload, tmp_path):
+    source, data = payload
+    target = tmp_path / "target.bin"
+    bot = download(FakeSession(), source, target, len(data))
+    
+    assert target.read_bytes() == data
+    assert bot.session.server.requests == 4
+
+
+def test_ranged_download_skips_prefix(payload, tmp_path):
+    source, data = payload
+    target = tmp_path / "target.bin"
+    bot = download(FakeSession(), source, target, len(data), prefix=data[:PART_SIZE])
+    
+    assert target.read_bytes() == data
+    assert bot.session.server.requests == 3
+
+
+def test_ranged_download_resumes_after_dropped_connection(payload, tmp_path):
+    source, data = payload
+    target = tmp_path / "target.bin"
+    bot = download(FakeSession(cut_after=100_000), source, target, len(data))
+    
+    assert target.read_bytes() == data
+    resumed = sorted(set(bot.session.server.range_headers) - {
+        f"bytes={start}-{min(start + PART_SIZE, len(data)) - 1}" for start in range(0, len(data), PART_SIZE)
+    })
+    assert resumed == [
+        f"bytes={start + 100_000}-{start + PART_SIZE - 1}" for start in range(0, 3 * PART_SIZE, PART_SIZE)
+    ]
+
+
+def test_dropped_connection_fails_without_retries(payload, tmp_path):
+    source, data = payload
+    with pytest.raises(Exception):
+        download(FakeSession(cut_after=100_000), source, tmp_path / "target.bin", len(data), retries=0)
+
+
+@pytest.mark.parametrize("delta", [1000, -1000])
+def test_size_mismatch_raises_download_error(payload, tmp_path, delta):
+    source, data = payload
+    with pytest.raises(DownloadError):
+        download(FakeSession(), source, tmp_path / "target.bin", len(data) + delta)
+
+
+def test_server_without_ranges_is_reported(payload, tmp_path):
+    source, data = payload
+    with pytest.raises(RangeNotSupported):
+        download(FakeSession(ranges=False), source, tmp_path / "target.bin", len(data))
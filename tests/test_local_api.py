@@ -0,0 +1,68 @@
+import asyncio
+import shutil
+import wave
+
+import pytest
+
+from benchmarks.fake_bot import FakeBot, FakeSession
+from bot.services import pipeline
+from bot.services.jobs import ConversionJob, KIND_VOICE
+from bot.utils.media_detect import MediaFile
+from bot.utils.stream_file import local_file_path, read_head
+
+
+@pytest.fixture
+def wav(tmp_path):
+    path = tmp_path / "speech.wav"
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(16000)
+        f.writeframes(b"\x00\x10" * 16000 * 3)
+    return path
+
+
+def test_local_file_path_only_in_local_mode(wav, tmp_path):
+    local, remote = FakeBot(session=FakeSession(local=True)), FakeBot(session=FakeSession())
+    
+    assert local_file_path(local, str(wav)) == str(wav)
+    assert local_file_path(remote, str(wav)) is None
+    assert local_file_path(local, str(tmp_path / "missing.wav")) is None
+    assert local_file_path(local, "voice/file_1.oga") is None
+
+
+def test_read_head_reads_local_file_in_place(wav):
+    bot = FakeBot(session=FakeSession(local=True))
+    
+    head = asyncio.run(read_head(bot, str(wav), 1024))
+    
+    assert head == wav.read_bytes()[:1024]
+    assert bot.session.server.requests == 0
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+def test_local_mode_converts_without_downloading(wav):
+    bot = FakeBot(session=FakeSession(local=True))
+    media = MediaFile(
+        file_id=str(wav),
+        file_unique_id="local-speech",
+        file_size=wav.stat().st_size,
+        filename=wav.name,
+        duration=3
+    )
+    job = ConversionJob(kind=KIND_VOICE, user_id=1, chat_id=1, media=media, reply_to_message_id=1)
+    
+    async def run():
+        try:
+            await pipeline.execute_job(bot, job)
+        finally:
+            await bot.session.close()
+    
+    asyncio.run(run())
+    
+    uploads = bot.uploads(1)
+    assert [call.method for call in uploads] == ["send_voice"]
+    assert uploads[0].size > 0
+    assert uploads[0].duration == 3
+    assert bot.session.server.requests == 0
+    assert wav.exists()
@@ -0,0 +1,159 @@
+import asyncio
+import itertools
+import socket
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiogram import Bot, Dispatcher, Router
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import Message
+
+from bot import main
+from bot.config import config
+from bot.services.drain import Drain
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class FakeTelegram:
+    
+    def __init__(self):
+        self.calls: list[tuple[str, dict]] = []
+        self._message_ids = itertools.count(1)
+        self._runner: web.AppRunner | None = None
+        self.base = ""
+    
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        data = dict(await request.post())
+        self.calls.append((method, data))
+        result = True
+        if method == "sendMessage":
+            result = {
+                "message_id": next(self._message_ids),
+                "date": 0,
+                "chat": {"id": int(data["chat_id"]), "type": "private"},
+                "text": data["text"],
+            }
+        return web.json_response({"ok": True, "result": result})
+    
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.base = "http://127.0.0.1:%d" % site._server.sockets[0].getsockname()[1]
+    
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+    
+    def sent(self) -> list[str]:
+        return [data["text"] for method, data in self.calls if method == "sendMessage"]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def update(update_id: int, text: str) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": 7, "type": "private"},
+            "from": {"id": 7, "is_bot": False, "first_name": "Test"},
+            "text": text,
+        },
+    }
+
+
+@pytest.fixture
+def drain(monkeypatch, tmp_path):
+    drain = Drain(config.drain_timeout, str(tmp_path / "drain.jsonl"))
+    monkeypatch.setattr(main, "drain", drain)
+    monkeypatch.setattr(config, "webhook_url", "")
+    monkeypatch.setattr(config, "webhook_host", "127.0.0.1")
+    monkeypatch.setattr(config, "webhook_port", free_port())
+    return drain
+
+
+def dispatcher(drain: Drain, delay: float = 0) -> Dispatcher:
+    router = Router()
+
+    @router.message()
+    async def echo(message: Message):
+        await asyncio.sleep(delay)
+        await message.answer(f"echo: {message.text}")
+    
+    dp = Dispatcher()
+    dp.update.outer_middleware(drain.track_updates)
+    dp.include_router(router)
+    return dp
+
+
+async def serve(drain: Drain, dp: Dispatcher, posts: list[tuple[dict, dict]]):
+    telegram = FakeTelegram()
+    await telegram.start()
+    bot = Bot("1:test", session=AiohttpSession(api=TelegramAPIServer.from_base(telegram.base)))
+    server = asyncio.create_task(main.run_webhook(bot, dp, None))
+    url = f"http://{config.webhook_host}:{config.webhook_port}{config.webhook_path}"
+    
+    statuses = []
+    try:
+        async with aiohttp.ClientSession() as session:
+            for _ in range(50):
+                try:
+                    await session.get(url)
+                    break
+                except aiohttp.ClientConnectionError:
+                    await asyncio.sleep(0.05)
+            for body, headers in posts:
+                async with session.post(url, json=body, headers=headers) as response:
+                    statuses.append(response.status)
+        drain.request()
+        await asyncio.wait_for(server, timeout=10)
+    finally:
+        server.cancel()
+        await bot.session.close()
+        await telegram.stop()
+    return statuses, telegram
+
+
+def test_webhook_handles_update_with_secret(drain):
+    headers = {SECRET_HEADER: main.webhook_secret()}
+    
+    statuses, telegram = asyncio.run(serve(drain, dispatcher(drain), [(update(1, "hello"), headers)]))
+    
+    assert statuses == [200]
+    assert telegram.sent() == ["echo: hello"]
+    assert drain.last_update_id == 1
+
+
+def test_webhook_rejects_wrong_secret(drain):
+    posts = [
+        (update(1, "no secret"), {}),
+        (update(2, "wrong secret"), {SECRET_HEADER: "wrong"}),
+    ]
+    
+    statuses, telegram = asyncio.run(serve(drain, dispatcher(drain), posts))
+    
+    assert statuses == [401, 401]
+    assert telegram.calls == []
+    assert drain.last_update_id is None
+
+
+def test_webhook_drain_finishes_update_in_flight(drain):
+    headers = {SECRET_HEADER: main.webhook_secret()}
+    
+    statuses, telegram = asyncio.run(serve(drain, dispatcher(drain, delay=1), [(update(3, "slow"), headers)]))
+    
+    assert statuses == [200]
+    assert telegram.sent() == ["echo: slow"]